@@ -6,6 +6,7 @@ import pandas as pd
 import wntr
 from wntr.network.controls import ControlPriority
 from infrarisk.src.physical import interdependencies as interdependencies
+from infrarisk.src.physical import integrated_network as integrated_network
 
 
 class NetworkRecovery:
@@ -111,7 +112,7 @@ class NetworkRecovery:
             # ----------------------------------------------------------
 
             # Schedule component performance at the start of the simulation.
-            for _, component in enumerate(self.network.get_disrupted_components()):
+            for component in self.network.get_disrupted_components():
                 self.event_table = self.event_table.append(
                     {
                         "time_stamp": 0,
@@ -157,7 +158,7 @@ class NetworkRecovery:
 
             while len(transpo_links_to_repair) > 0:
                 recovery_start = None
-                for _, component in enumerate(transpo_links_to_repair):
+                for component in transpo_links_to_repair:
                     compon_details = interdependencies.get_compon_details(component)
 
                     if compon_details[0] == "transpo":
@@ -398,7 +399,7 @@ class NetworkRecovery:
 
             while len(components_to_repair) > 0:
                 recovery_start = None
-                for _, component in enumerate(components_to_repair):
+                for component in components_to_repair:
                     compon_details = interdependencies.get_compon_details(component)
 
                     if compon_details[0] == "power":
@@ -1106,22 +1107,24 @@ class NetworkRecovery:
         pass
 
     def fail_transpo_link(self, link_compon):
-        """Fails the given transportation link by changing the free-flow travel time to a very large value.
+        """Fails the given transportation link by changing the free-flow travel time to a very large value, and updates the link cost accordingly.
 
         Args:
             link_compon (string): Name of the transportation link.
         """
-        self.network.tn.link[link_compon].freeFlowTime = 9999
+        link = self.network.tn.link[link_compon]
+        link.freeFlowTime = 9999
+        link.updateCost()
 
     def restore_transpo_link(self, link_compon):
-        """Restores the disrupted transportation link by changing the free flow travel time to the original value.
+        """Restores the disrupted transportation link by changing the free flow travel time to the original value, and updates the link cost accordingly.
 
         Args:
             link_compon (string): Name of the transportation link.
         """
-        self.network.tn.link[link_compon].freeFlowTime = self.network.tn.link[
-            link_compon
-        ].fft_base
+        link = self.network.tn.link[link_compon]
+        link.freeFlowTime = link.fft_base
+        link.updateCost()
 
     def check_route_accessibility(self, failed_transpo_link_en_route):
         """Checks when the failed transportation links along a route are repaired and the possible start time.
@@ -1198,16 +1201,17 @@ class NetworkRecovery:
 
 
 def pipe_leak_node_generator(network):
-    """Splits the directly affected pipes to induce leak during simulations.
-    :param wn: Water network object.
-    :type wn: wntr network object
+    """Splits the directly affected pipes to induce leak during simulations. The water network model of the given network is modified in place, so the network must not be the base network of a NetworkRecovery object.
+    :param network: An integrated network object
+    :type network: IntegratedNetwork object
     """
-    for _, component in enumerate(network.get_disrupted_components()):
-        compon_details = interdependencies.get_compon_details(component)
-        if compon_details[3] == "Pipe":
-            network.wn = wntr.morph.split_pipe(
-                network.wn, component, f"{component}_B", f"{component}_leak_node"
-            )
+    pipes_to_split = [
+        component
+        for component in network.get_disrupted_components()
+        if interdependencies.get_compon_details(component)[3] == "Pipe"
+    ]
+    integrated_network.split_pipes(network.wn, pipes_to_split)
+    network.invalidate_graph("water")
 
 
 def link_open_event(wn, pipe_name, time_stamp, state):
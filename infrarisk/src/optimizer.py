@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
-from itertools import permutations
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, permutations
+from math import perm
 from sklearn import metrics
 import pandas as pd
 import timeit
 import copy
+import multiprocessing
+import os
 
 
 class Optimizer(ABC):
@@ -34,41 +38,49 @@ class BruteForceOptimizer(Optimizer):
     :type Optimizer: Optimizer abstract class.
     """
 
-    def __init__(self, prediction_horizon=None):
+    def __init__(self, prediction_horizon=None, max_workers=1):
         """Initiates a BruteForceOptimizer object
 
         :param prediction_horizon: The size of the prediction horizon, defaults to None
         :type prediction_horizon: non-negative integer, optional
+        :param max_workers: The number of processes used to simulate the repair orders in a prediction horizon. If 1, the repair orders are simulated in the current process. If None, the number of processors on the machine is used. The simulation object must be picklable to use more than one process, and the worker processes are started with the spawn method, so scripts must guard their entry point with if __name__ == "__main__", defaults to 1
+        :type max_workers: positive integer, optional
         """
         if prediction_horizon is None:
             self.prediction_horizon = 0
         else:
             self.prediction_horizon = prediction_horizon
 
+        self.max_workers = max_workers
+
         self.best_repair_strategy = None
 
         self.auc = None
         self.auc_log = pd.DataFrame(
             columns=["repair_order", "water_auc", "power_auc", "auc"]
         )
+        self._auc_rows = []
+        self._prefix_cache = dict()
+        self.resilience_metrics = None
         self.trackers = None
 
         # self.set_auc_temp_log()
 
-    def get_repair_permutations(self, simulation):
+    def get_repair_permutations(self, simulation, comps_to_repair=None):
         """Returns all possible permutations of the repair order.
 
         :param simulation: An integrated infrastructure network simulation object.
         :type simulation: Simulation object
-        :return: A nested list of all possible repair permutations for the given list of components.
-        :rtype: list of lists of strings.
+        :param comps_to_repair: The components that are yet to be repaired, defaults to None (obtained from the simulation)
+        :type comps_to_repair: list of strings, optional
+        :return: An iterator over all possible repair permutations for the given list of components, with common prefixes next to each other.
+        :rtype: iterator of tuples of strings.
         """
-        comps_to_repair = simulation.get_components_to_repair()
-        if len(comps_to_repair) >= self.prediction_horizon:
-            repair_permuts = permutations(comps_to_repair, self.prediction_horizon)
-        else:
-            repair_permuts = permutations(comps_to_repair, len(comps_to_repair))
-        return [list(x) for x in list(repair_permuts)]
+        if comps_to_repair is None:
+            comps_to_repair = simulation.get_components_to_repair()
+        return permutations(
+            comps_to_repair, min(len(comps_to_repair), self.prediction_horizon)
+        )
 
     def find_optimal_recovery(self, simulation):
         """Identifies the optimal recovery strategy using the Model Predictive Control principle.
@@ -78,98 +90,45 @@ class BruteForceOptimizer(Optimizer):
         """
         start = timeit.default_timer()
         counter = 1
+        self._prefix_cache.clear()
 
-        while len(simulation.get_components_to_repair()) > 0:
+        comps_to_repair = simulation.get_components_to_repair()
+        while len(comps_to_repair) > 0:
+            comps_repaired = simulation.get_components_repaired()
             print(f"PREDICTION HORIZON {counter}")
             print("*" * 50)
             print(
                 "Components to repair: ",
-                simulation.get_components_to_repair(),
+                comps_to_repair,
                 "Components repaired: ",
-                simulation.get_components_repaired(),
+                comps_repaired,
             )
 
-            repair_orders = self.get_repair_permutations(simulation)
+            repair_orders = self.get_repair_permutations(simulation, comps_to_repair)
             print(
-                "Repair orders under consideration in the current prediction horizon: ",
-                repair_orders,
+                "Number of repair orders under consideration in the current prediction horizon: ",
+                perm(
+                    len(comps_to_repair),
+                    min(len(comps_to_repair), self.prediction_horizon),
+                ),
             )
 
             print("-" * 50)
 
-            for repair_order in repair_orders:
-                curr_simulation = copy.deepcopy(simulation)
-
-                cum_repair_order = (
-                    curr_simulation.get_components_repaired() + repair_order
-                )
-                print(
-                    "Simulating the current cumulative repair order",
-                    cum_repair_order,
-                    "...",
-                )
-
-                curr_simulation.network_recovery.schedule_recovery(cum_repair_order)
-                # print(curr_simulation.network_recovery.get_event_table())
-                curr_simulation.expand_event_table(1)
-                # print(curr_simulation.network_recovery.get_event_table())
-
-                resilience_metrics = curr_simulation.simulate_interdependent_effects(
-                    curr_simulation.network_recovery
-                )
-
-                resilience_metrics.calculate_power_resmetric(
-                    curr_simulation.network_recovery
-                )
-                resilience_metrics.calculate_water_resmetrics(
-                    curr_simulation.network_recovery
-                )
-
-                resilience_metrics.set_weighted_auc_metrics()
-                power_auc, water_auc, weighted_auc = (
-                    resilience_metrics.power_auc_pcs,
-                    resilience_metrics.water_auc_pcs,
-                    resilience_metrics.weighed_pcs_auc,
-                )
-
-                print(
-                    "Water AUC: ",
-                    round(water_auc, 3),
-                    "\t",
-                    "Power AUC: ",
-                    round(power_auc, 3),
-                    "\t",
-                    "Weighted AUC: ",
-                    round(weighted_auc, 3),
-                )
-                self.auc_log = self.auc_log.append(
-                    {
-                        "repair_order": cum_repair_order,
-                        "water_auc": round(water_auc, 3),
-                        "power_auc": round(power_auc, 3),
-                        "auc": round(weighted_auc, 3),
-                    },
-                    ignore_index=True,
-                )
-                if (self.auc == None) or (
-                    resilience_metrics.weighed_pcs_auc >= self.auc
-                ):
-                    self.auc = weighted_auc
-                    self.best_repair_strategy = cum_repair_order
-                    # self.trackers = [
-                    #     resilience_metrics.get_time_tracker(),
-                    #     resilience_metrics.get_power_consump_tracker(),
-                    #     resilience_metrics.get_water_consump_tracker(),
-                    # ]
-                    self.resilience_metrics = resilience_metrics
-
-                # simulation.network_recovery.reset_networks()
-
-            best_repair_component = [
-                i
-                for i in self.best_repair_strategy
-                if i not in curr_simulation.get_components_repaired()
-            ][0]
+            self.record_repair_order_results(
+                self.evaluate_repair_orders(simulation, repair_orders, comps_repaired)
+            )
+            if self.resilience_metrics is None:
+                # The best repair order was reused from an earlier prediction
+                # horizon, whose resilience metrics are not cached.
+                self.resilience_metrics = evaluate_repair_order(
+                    simulation, self.best_repair_strategy[len(comps_repaired) :]
+                )[-1]
+
+            repaired_set = set(comps_repaired)
+            best_repair_component = next(
+                i for i in self.best_repair_strategy if i not in repaired_set
+            )
 
             print(
                 f"\n{best_repair_component} is identified as the next best repair action in the current prediction horizon. The repair order {self.best_repair_strategy} produced the highest AUC of {round(self.auc, 3)}"
@@ -177,6 +136,7 @@ class BruteForceOptimizer(Optimizer):
             print("-" * 50)
 
             simulation.update_repaired_components(best_repair_component)
+            comps_to_repair = simulation.get_components_to_repair()
 
             self.auc = None
             counter += 1
@@ -188,9 +148,136 @@ class BruteForceOptimizer(Optimizer):
             )
         )
 
+        self._prefix_cache.clear()
         stop = timeit.default_timer()
         print("Process completed in ", round(stop - start, 0), " seconds")
 
+    def evaluate_repair_orders(
+        self, simulation, repair_orders, components_repaired=None
+    ):
+        """Simulates the repair orders of the current prediction horizon. The AUC values are cached by cumulative repair order, so that a cumulative repair order simulated in an earlier prediction horizon is not simulated again.
+
+        :param simulation: The infrastructure network simulation object.
+        :type simulation: Simulation object
+        :param repair_orders: The repair orders of the current prediction horizon.
+        :type repair_orders: iterable of tuples of strings
+        :param components_repaired: The components that are already repaired, defaults to None (obtained from the simulation)
+        :type components_repaired: list of strings, optional
+        :return: The results of evaluate_repair_order for the repair orders, in the order of the repair orders. For a reused repair order, the resilience metrics object is only available if it is the best repair order found so far, and None otherwise.
+        :rtype: generator of tuples
+        """
+        if components_repaired is None:
+            components_repaired = simulation.get_components_repaired()
+        components_repaired = tuple(components_repaired)
+
+        if self.max_workers == 1:
+            chunk_size = 1
+        else:
+            chunk_size = 4 * (self.max_workers or os.cpu_count() or 1)
+
+        repair_orders = iter(repair_orders)
+        executor = None
+        try:
+            # The repair orders are simulated in chunks, so that at most a
+            # few repair orders per process are waiting in the pool.
+            for chunk in iter(lambda: tuple(islice(repair_orders, chunk_size)), ()):
+                uncached_orders = [
+                    repair_order
+                    for repair_order in chunk
+                    if components_repaired + repair_order not in self._prefix_cache
+                ]
+                if self.max_workers == 1 or len(uncached_orders) == 0:
+                    new_results = (
+                        evaluate_repair_order(simulation, repair_order)
+                        for repair_order in uncached_orders
+                    )
+                else:
+                    if executor is None:
+                        # Forking can deadlock once the parallel numba kernels of
+                        # the transportation model have started their threads.
+                        executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_set_worker_simulation,
+                            initargs=(simulation,),
+                        )
+                    new_results = executor.map(
+                        _evaluate_repair_order_in_worker, uncached_orders
+                    )
+
+                for repair_order in chunk:
+                    key = components_repaired + repair_order
+                    if key in self._prefix_cache:
+                        print(
+                            "Reusing the results of the cumulative repair order",
+                            list(key),
+                        )
+                        cum_repair_order = list(key)
+                        resilience_metrics = (
+                            self.resilience_metrics
+                            if cum_repair_order == self.best_repair_strategy
+                            else None
+                        )
+                        yield (
+                            cum_repair_order,
+                            *self._prefix_cache[key],
+                            resilience_metrics,
+                        )
+                    else:
+                        result = next(new_results)
+                        self._prefix_cache[key] = result[1:4]
+                        yield result
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def record_repair_order_results(self, results):
+        """Logs the resilience metrics of the simulated repair orders and keeps track of the best repair order in the current prediction horizon.
+
+        :param results: The results of evaluate_repair_order for each repair order, in the order the repair orders were generated.
+        :type results: iterable of tuples
+        """
+        for (
+            cum_repair_order,
+            power_auc,
+            water_auc,
+            weighted_auc,
+            resilience_metrics,
+        ) in results:
+            print(
+                "Water AUC: ",
+                round(water_auc, 3),
+                "\t",
+                "Power AUC: ",
+                round(power_auc, 3),
+                "\t",
+                "Weighted AUC: ",
+                round(weighted_auc, 3),
+            )
+            self._auc_rows.append(
+                {
+                    "repair_order": cum_repair_order,
+                    "water_auc": round(water_auc, 3),
+                    "power_auc": round(power_auc, 3),
+                    "auc": round(weighted_auc, 3),
+                }
+            )
+            if (self.auc == None) or (weighted_auc >= self.auc):
+                self.auc = weighted_auc
+                self.best_repair_strategy = cum_repair_order
+                # self.trackers = [
+                #     resilience_metrics.get_time_tracker(),
+                #     resilience_metrics.get_power_consump_tracker(),
+                #     resilience_metrics.get_water_consump_tracker(),
+                # ]
+                self.resilience_metrics = resilience_metrics
+
+        self.auc_log = pd.concat(
+            [self.auc_log, pd.DataFrame(self._auc_rows, columns=self.auc_log.columns)],
+            ignore_index=True,
+        )
+        self._auc_rows.clear()
+
     def get_trackers(self):
         """Returns the time, power consumption ratio and water consumption ratio values.
 
@@ -206,3 +293,58 @@ class BruteForceOptimizer(Optimizer):
         :rtype: pandas dataframe.
         """
         return self.auc_log
+
+
+def evaluate_repair_order(simulation, repair_order):
+    """Simulates the interdependent effects of repairing the components in the given order after the components that are already repaired.
+
+    :param simulation: The infrastructure network simulation object. It is not modified.
+    :type simulation: Simulation object
+    :param repair_order: The order in which the remaining components are repaired.
+    :type repair_order: list or tuple of strings
+    :return: The cumulative repair order, the power, water and weighted AUC values, and the resilience metrics object.
+    :rtype: tuple
+    """
+    curr_simulation = copy.deepcopy(simulation)
+
+    cum_repair_order = curr_simulation.get_components_repaired() + list(repair_order)
+    print(
+        "Simulating the current cumulative repair order",
+        cum_repair_order,
+        "...",
+    )
+
+    curr_simulation.network_recovery.schedule_recovery(cum_repair_order)
+    # print(curr_simulation.network_recovery.get_event_table())
+    curr_simulation.expand_event_table(1)
+    # print(curr_simulation.network_recovery.get_event_table())
+
+    resilience_metrics = curr_simulation.simulate_interdependent_effects(
+        curr_simulation.network_recovery
+    )
+
+    resilience_metrics.calculate_power_resmetric(curr_simulation.network_recovery)
+    resilience_metrics.calculate_water_resmetrics(curr_simulation.network_recovery)
+
+    resilience_metrics.set_weighted_auc_metrics()
+    return (
+        cum_repair_order,
+        resilience_metrics.power_auc_pcs,
+        resilience_metrics.water_auc_pcs,
+        resilience_metrics.weighed_pcs_auc,
+        resilience_metrics,
+    )
+
+
+# The simulation object is sent to each worker process once per prediction
+# horizon instead of once per repair order.
+_worker_simulation = None
+
+
+def _set_worker_simulation(simulation):
+    global _worker_simulation
+    _worker_simulation = simulation
+
+
+def _evaluate_repair_order_in_worker(repair_order):
+    return evaluate_repair_order(_worker_simulation, repair_order)
@@ -1,12 +1,26 @@
 from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+import multiprocessing
 import pandas as pd
 import networkx as nx
 import wntr
-import math
 import os
+import sys
+from operator import attrgetter
 import numpy as np
 import geopandas as gpd
 
+try:
+    import networkit as nk
+except ImportError:
+    nk = None
+
+try:
+    import pyogrio
+except ImportError:
+    pyogrio = None
+
 import infrarisk.src.physical.interdependencies as interdependencies
 import infrarisk.src.physical.water.water_network_model as water
 import infrarisk.src.physical.power.power_system_model as power
@@ -15,6 +29,49 @@ import infrarisk.src.plots as model_plots
 
 import infrarisk.src.repair_crews as repair_crews
 
+PIPE_TYPES = frozenset(
+    {
+        "Pipe",
+        "Service Connection Pipe",
+        "Main Pipe",
+        "Hydrant Connection Pipe",
+        "Valve converted to Pipe",
+    }
+)
+
+NODE_LINK_DICT = MappingProxyType(
+    {
+        "water": MappingProxyType(
+            {
+                "node": frozenset({"R", "J", "JIN", "JVN", "JTN", "JHY", "T"}),
+                "link": frozenset({"P", "PSC", "PMA", "PHC", "PV", "WP"}),
+            }
+        ),
+        "power": MappingProxyType(
+            {
+                "node": frozenset({"B", "BL", "BS", "LO", "MP", "AL", "AS", "G"}),
+                "link": frozenset({"S", "L", "LS", "TF", "TH", "I", "DL"}),
+            }
+        ),
+        "transpo": MappingProxyType(
+            {"node": frozenset({"J"}), "link": frozenset({"L"})}
+        ),
+    }
+)
+
+COMPON_ROLE_DICT = MappingProxyType(
+    {
+        infra: MappingProxyType(
+            {
+                compon_type: role
+                for role, compon_types in role_dict.items()
+                for compon_type in compon_types
+            }
+        )
+        for infra, role_dict in NODE_LINK_DICT.items()
+    }
+)
+
 
 class IntegratedNetwork:
     """An integrated infrastructure network class"""
@@ -44,6 +101,9 @@ class IntegratedNetwork:
         :type water_sim_type: string
         """
         self.name = name
+        self._graph_versions = {"power": 0, "water": 0, "transpo": 0}
+        self._graph_cache = dict()
+        self._betweenness_cache = dict()
 
         if water_folder is None:
             self.wn = None
@@ -109,6 +169,7 @@ class IntegratedNetwork:
             )
             power.run_power_simulation(pn)
             self.pn = pn
+            self.invalidate_graph("power")
             self.power_sim_time = power_sim_type
             self.base_power_supply = power.generate_base_supply(pn)
         except UserWarning:
@@ -119,22 +180,21 @@ class IntegratedNetwork:
 
         if os.path.exists(power_folder / "line_to_switch_map.csv"):
             line_switch_df = pd.read_csv(
-                power_folder / "line_to_switch_map.csv", sep=","
+                power_folder / "line_to_switch_map.csv", sep=",", dtype=str
             )
 
-            self.line_switch_dict = dict()
-            for _, row in line_switch_df.iterrows():
-                line = row["line"]
-                switch_list = [x for x in row[1:] if x is not np.nan]
-                self.line_switch_dict[line] = switch_list
+            lines = line_switch_df["line"].values
+            switches = line_switch_df.iloc[:, 1:].values
+            switch_mask = ~pd.isna(switches)
+            self.line_switch_dict = {
+                line: list(switches[i][switch_mask[i]]) for i, line in enumerate(lines)
+            }
 
         if os.path.exists(power_folder / "service_area/service_area.shp"):
             print("Loading power service area details...")
-            pn.service_area = gpd.read_file(
-                power_folder / "service_area/service_area.shp",
-                crs={"init": "epsg:4326"},
+            pn.service_area = read_service_area(
+                power_folder / "service_area/service_area.shp"
             )
-            pn.service_area = pn.service_area.to_crs({"init": "epsg:3857"})
             pn.service_area.Power_Node = "P_LO" + pn.service_area.Power_Node.astype(str)
             pn.service_area.Id = pn.service_area.index
 
@@ -150,6 +210,7 @@ class IntegratedNetwork:
         self.wn = water.load_water_network(
             f"{water_folder}/water.inp", water_sim_type, initial_sim_step
         )
+        self.invalidate_graph("water")
         self.water_sim_type = water_sim_type
 
         if water_sim_type == "DDA":
@@ -175,21 +236,22 @@ class IntegratedNetwork:
             )
 
         if os.path.exists(water_folder / "pipe_to_valve_map.csv"):
-            pipe_valve_df = pd.read_csv(water_folder / "pipe_to_valve_map.csv", sep=",")
+            pipe_valve_df = pd.read_csv(
+                water_folder / "pipe_to_valve_map.csv", sep=",", dtype=str
+            )
 
-            self.pipe_valve_dict = dict()
-            for _, row in pipe_valve_df.iterrows():
-                pipe = row["pipe"]
-                valve_list = [x for x in row[1:] if x is not np.nan]
-                self.pipe_valve_dict[pipe] = valve_list
+            pipes = pipe_valve_df["pipe"].values
+            valves = pipe_valve_df.iloc[:, 1:].values
+            valve_mask = ~pd.isna(valves)
+            self.pipe_valve_dict = {
+                pipe: list(valves[i][valve_mask[i]]) for i, pipe in enumerate(pipes)
+            }
 
         if os.path.exists(water_folder / "service_area/service_area.shp"):
             print("Loading water service area details...")
-            self.wn.service_area = gpd.read_file(
-                water_folder / "service_area/service_area.shp",
-                crs={"init": "epsg:4326"},
+            self.wn.service_area = read_service_area(
+                water_folder / "service_area/service_area.shp"
             )
-            self.wn.service_area = self.wn.service_area.to_crs({"init": "epsg:3857"})
             self.wn.service_area.Water_Node = (
                 "W_J" + self.wn.service_area.Water_Node.astype(str)
             )
@@ -212,6 +274,7 @@ class IntegratedNetwork:
             )
             # tn.userEquilibrium("FW", 400, 1e-4, tn.averageExcessCost)
             self.tn = tn
+            self.invalidate_graph("transpo")
             self.base_transpo_flow = tn
         except FileNotFoundError:
             print(
@@ -229,9 +292,8 @@ class IntegratedNetwork:
         self.transpo_graph = self.generate_transpo_networkx_graph()
         print("Successfully added transportation network to the integrated graph...")
 
-        G = nx.compose(
-            self.power_graph, nx.compose(self.water_graph, self.transpo_graph)
-        )
+        G = nx.compose_all([self.power_graph, self.water_graph, self.transpo_graph])
+        G.graph["version"] = tuple(self._graph_versions.values())
 
         self.integrated_graph = G
         self.set_map_extends()
@@ -239,42 +301,134 @@ class IntegratedNetwork:
 
         title = f"{self.name} integrated network"
 
-        self.generate_betweenness_centrality()
         model_plots.plot_bokeh_from_integrated_graph(
             G, title=title, extent=self.map_extends, basemap=basemap
         )
 
-    def generate_betweenness_centrality(self):
-        """Generates the betweenness centrality of the integrated graph."""
-        print("Generating betweenness centrality...")
-        pn_nx = self.power_graph
-        wn_nx = self.water_graph
-        tn_nx = self.transpo_graph
+    def generate_betweenness_centrality(self, k=None, seed=None, max_workers=1):
+        """Generates the betweenness centrality of the infrastructure graphs. Without calling this method, the exact centralities are calculated lazily when the respective attributes (e.g., pn_nodebc) are first accessed.
 
-        self.pn_nodebc = nx.betweenness_centrality(pn_nx, normalized=True)
-        self.pn_edgebc = nx.edge_betweenness_centrality(pn_nx, normalized=True)
+        :param k: The number of source nodes sampled to approximate the betweenness centrality, defaults to None (exact betweenness centrality)
+        :type k: integer, optional
+        :param seed: The seed of the random source node sampling, defaults to None
+        :type seed: integer, optional
+        :param max_workers: The number of processes used to calculate the centralities of the three infrastructure graphs. If None, one process per infrastructure is used. The worker processes are started with the spawn method, so scripts must guard their entry point with if __name__ == "__main__", defaults to 1 (calculated in the current process)
+        :type max_workers: positive integer, optional
+        """
+        print("Generating betweenness centrality...")
+        infras = ["power", "water", "transpo"]
+        if max_workers == 1:
+            for infra in infras:
+                self.set_betweenness_centrality(infra, k=k, seed=seed)
+        else:
+            # Forking can deadlock once the parallel numba kernels of the
+            # transportation model have started their threads.
+            with ProcessPoolExecutor(
+                max_workers=max_workers or len(infras),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = {
+                    infra: executor.submit(
+                        calculate_betweenness_centrality,
+                        self.get_networkx_graph(infra),
+                        k,
+                        seed,
+                    )
+                    for infra in infras
+                }
+                for infra, future in futures.items():
+                    key = (infra, self._graph_versions[infra])
+                    self._betweenness_cache[key] = future.result()
+
+    def set_betweenness_centrality(self, infra, k=None, seed=None):
+        """Calculates and stores the node and edge betweenness centrality of the current infrastructure graph.
+
+        :param infra: The infrastructure type, either "power", "water" or "transpo".
+        :type infra: string
+        :param k: The number of source nodes sampled to approximate the betweenness centrality, defaults to None (exact betweenness centrality)
+        :type k: integer, optional
+        :param seed: The seed of the random source node sampling, defaults to None
+        :type seed: integer, optional
+        """
+        key = (infra, self._graph_versions[infra])
+        self._betweenness_cache[key] = calculate_betweenness_centrality(
+            self.get_networkx_graph(infra), k=k, seed=seed
+        )
 
-        self.wn_nodebc = nx.betweenness_centrality(wn_nx, normalized=True)
-        self.wn_edgebc = nx.edge_betweenness_centrality(wn_nx, normalized=True)
+    def get_betweenness_centrality(self, infra):
+        """Returns the node and edge betweenness centrality of an infrastructure graph. The exact centralities are calculated on the first request and reused until the infrastructure graph is invalidated.
 
-        self.tn_nodebc = nx.betweenness_centrality(tn_nx, normalized=True)
-        self.tn_edgebc = nx.edge_betweenness_centrality(tn_nx, normalized=True)
+        :param infra: The infrastructure type, either "power", "water" or "transpo".
+        :type infra: string
+        :return: The node and edge betweenness centrality.
+        :rtype: tuple of dictionaries
+        """
+        key = (infra, self._graph_versions[infra])
+        if key not in self._betweenness_cache:
+            self.set_betweenness_centrality(infra)
+        return self._betweenness_cache[key]
+
+    def get_networkx_graph(self, infra):
+        """Returns the networkx graph of an infrastructure network.
+
+        :param infra: The infrastructure type, either "power", "water" or "transpo".
+        :type infra: string
+        :return: The networkx graph of the infrastructure network.
+        :rtype: networkx graph
+        """
+        if infra == "power":
+            return self.generate_power_networkx_graph()
+        elif infra == "water":
+            return self.generate_water_networkx_graph()
+        elif infra == "transpo":
+            return self.generate_transpo_networkx_graph()
+
+    @property
+    def pn_nodebc(self):
+        """The node betweenness centrality of the power network."""
+        return self.get_betweenness_centrality("power")[0]
+
+    @property
+    def pn_edgebc(self):
+        """The edge betweenness centrality of the power network."""
+        return self.get_betweenness_centrality("power")[1]
+
+    @property
+    def wn_nodebc(self):
+        """The node betweenness centrality of the water network."""
+        return self.get_betweenness_centrality("water")[0]
+
+    @property
+    def wn_edgebc(self):
+        """The edge betweenness centrality of the water network."""
+        return self.get_betweenness_centrality("water")[1]
+
+    @property
+    def tn_nodebc(self):
+        """The node betweenness centrality of the transportation network."""
+        return self.get_betweenness_centrality("transpo")[0]
+
+    @property
+    def tn_edgebc(self):
+        """The edge betweenness centrality of the transportation network."""
+        return self.get_betweenness_centrality("transpo")[1]
 
     def set_map_extends(self):
         """Sets the extents of the map in the format ((xmin, ymin), (xmax, ymax))."""
-        x, y = [], []
-        for node in self.integrated_graph.nodes:
-            x_coord, y_coord = self.integrated_graph.nodes[node]["coord"]
-            x.append(x_coord)
-            y.append(y_coord)
-
-        xdiff = math.floor(max(x)) - math.floor(min(x))
-        ydiff = math.floor(max(y)) - math.floor(min(y))
+        node_coords = self.integrated_graph.nodes(data="coord")
+        coords = np.fromiter(
+            (value for _, coord in node_coords for value in coord),
+            dtype=float,
+            count=2 * self.integrated_graph.number_of_nodes(),
+        ).reshape(-1, 2)
+
+        mins = np.floor(coords.min(axis=0))
+        maxs = np.floor(coords.max(axis=0))
         tol = 0.2
 
         self.map_extends = [
-            (math.floor(min(x)) - tol * xdiff, math.floor(min(y)) - tol * ydiff),
-            (math.floor(max(x)) + tol * xdiff, math.floor(max(y)) + tol * ydiff),
+            tuple((mins - tol * (maxs - mins)).tolist()),
+            tuple((maxs + tol * (maxs - mins)).tolist()),
         ]
 
     def get_map_extends(self):
@@ -285,300 +439,225 @@ class IntegratedNetwork:
         """
         return self.map_extends
 
+    def invalidate_graph(self, infra):
+        """Marks the networkx graph of an infrastructure as outdated. Must be called whenever the components or the coordinates of the infrastructure network are modified in place, so that the graph and its betweenness centrality are generated again.
+
+        :param infra: The infrastructure type ("power", "water" or "transpo").
+        :type infra: string
+        """
+        self._betweenness_cache.pop((infra, self._graph_versions[infra]), None)
+        self._graph_versions[infra] += 1
+        self._graph_cache.pop(infra, None)
+
+    def get_graph_version(self, infra):
+        """Returns the number of times the infrastructure network has been loaded or modified.
+
+        :param infra: The infrastructure type ("power", "water" or "transpo").
+        :type infra: string
+        :return: The version of the infrastructure graph.
+        :rtype: integer
+        """
+        return self._graph_versions[infra]
+
     def generate_power_networkx_graph(self, plot=False):
-        """Generates the power network as a networkx object.
+        """Generates the power network as a networkx object. The graph is cached and shared until invalidate_graph("power") is called, so it must not be modified by the caller.
 
         :param plot: To generate the network plot, defaults to False.
         :type plot: bool, optional
         :return: The power network as a networkx object.
         :rtype: Networkx object
         """
+        version = self._graph_versions["power"]
+        if not plot and self._graph_cache.get("power", (None,))[0] == version:
+            return self._graph_cache["power"][1]
+
         G_power = nx.Graph()
 
         # power network nodes
-        power_nodes = pd.DataFrame(
-            columns=["id", "node_type", "node_category", "x", "y"]
-        )
-
-        for index, row in self.pn.bus.iterrows():
-            power_nodes = power_nodes.append(
-                {
-                    "id": row["name"],
-                    "node_type": "power_node",
-                    "node_category": "Bus",
-                    "x": self.pn.bus_geodata.x[index],
-                    "y": self.pn.bus_geodata.y[index],
-                },
-                ignore_index=True,
-            )
+        power_nodes = {
+            "id": self.pn.bus["name"].values,
+            "x": self.pn.bus_geodata.x.loc[self.pn.bus.index].values,
+            "y": self.pn.bus_geodata.y.loc[self.pn.bus.index].values,
+        }
 
         # power network links
-        power_links = pd.DataFrame(
-            columns=["id", "link_type", "link_category", "from", "to"]
+        bus_names = self.pn.bus["name"].values
+        bus_coords = dict(
+            zip(bus_names, zip(power_nodes["x"].tolist(), power_nodes["y"].tolist()))
         )
-
-        for _, row in self.pn.line.iterrows():
-            power_links = power_links.append(
-                {
-                    "id": row["name"],
-                    "link_type": "Power",
-                    "link_category": "Power line",
-                    "from": self.pn.bus.name.values[row["from_bus"]],
-                    "to": self.pn.bus.name.values[row["to_bus"]],
-                },
-                ignore_index=True,
-            )
-
-        for _, row in self.pn.trafo.iterrows():
-            power_links = power_links.append(
-                {
-                    "id": row["name"],
-                    "link_type": "Power",
-                    "link_category": "Transformer",
-                    "from": self.pn.bus.name.values[row["hv_bus"]],
-                    "to": self.pn.bus.name.values[row["lv_bus"]],
-                },
-                ignore_index=True,
-            )
-
-        for _, row in self.pn.switch[self.pn.switch.et == "b"].iterrows():
-            power_links = power_links.append(
-                {
-                    "id": row["name"],
-                    "link_type": "Power",
-                    "link_category": "Switch",
-                    "from": self.pn.bus.name.values[row["bus"]],
-                    "to": self.pn.bus.name.values[row["element"]],
-                },
-                ignore_index=True,
+        bus_switches = self.pn.switch[self.pn.switch["et"].values == "b"]
+        for link_table, link_category, from_col, to_col in [
+            (self.pn.line, "Power line", "from_bus", "to_bus"),
+            (self.pn.trafo, "Transformer", "hv_bus", "lv_bus"),
+            (bus_switches, "Switch", "bus", "element"),
+        ]:
+            from_buses = bus_names[link_table[from_col].values]
+            to_buses = bus_names[link_table[to_col].values]
+            G_power.add_edges_from(
+                (
+                    from_bus,
+                    to_bus,
+                    {
+                        "id": link_name,
+                        "link_type": "Power",
+                        "link_category": link_category,
+                        "length": length,
+                    },
+                )
+                for link_name, from_bus, to_bus, length in zip(
+                    link_table["name"].values,
+                    from_buses,
+                    to_buses,
+                    calculate_edge_lengths(bus_coords, from_buses, to_buses),
+                )
             )
 
-        G_power = nx.from_pandas_edgelist(
-            power_links,
-            source="from",
-            target="to",
-            edge_attr=True,
+        nx.set_node_attributes(G_power, "power_node", "node_type")
+        nx.set_node_attributes(G_power, "Bus", "node_category")
+        nx.set_node_attributes(
+            G_power,
+            dict(zip(power_nodes["id"], zip(power_nodes["x"], power_nodes["y"]))),
+            "coord",
         )
 
-        for _, row in power_nodes.iterrows():
-            G_power.nodes[row["id"]]["node_type"] = row["node_type"]
-            G_power.nodes[row["id"]]["node_category"] = row["node_category"]
-            G_power.nodes[row["id"]]["coord"] = (row["x"], row["y"])
-
-        for graph in [G_power]:
-            for _, link in enumerate(graph.edges.keys()):
-                start_node, end_node = link
-                start_coords = graph.nodes[link[0]]["coord"]
-                end_coords = graph.nodes[link[1]]["coord"]
-                graph.edges[link]["length"] = round(
-                    math.sqrt(
-                        ((start_coords[0] - end_coords[0]) ** 2)
-                        + ((start_coords[1] - end_coords[1]) ** 2)
-                    ),
-                    3,
-                )
-
         if plot == True:
-            pos = {node: G_power.nodes[node]["coord"] for node in power_nodes.id}
+            pos = {node: G_power.nodes[node]["coord"] for node in power_nodes["id"]}
             nx.draw(G_power, pos, node_size=1)
 
+        self._graph_cache["power"] = (version, G_power)
         return G_power
 
     def generate_water_networkx_graph(self, plot=False):
-        """Generates the water network as a networkx object.
+        """Generates the water network as a networkx object. The graph is cached and shared until invalidate_graph("water") is called, so it must not be modified by the caller.
 
         :param plot: To generate the network plot, defaults to False., defaults to False.
         :type plot: bool, optional
         :return: The water network as a networkx object.
         :rtype: Networkx object
         """
+        version = self._graph_versions["water"]
+        if not plot and self._graph_cache.get("water", (None,))[0] == version:
+            return self._graph_cache["water"][1]
+
         G_water = nx.Graph()
 
         # water network nodes
-        water_nodes = pd.DataFrame(
-            columns=["id", "node_type", "node_category", "x", "y"]
-        )
-
-        water_junc_list = self.wn.junction_name_list
-        water_tank_list = self.wn.tank_name_list
-        water_reserv_list = self.wn.reservoir_name_list
-
-        for _, node_name in enumerate(water_junc_list):
-            water_nodes = water_nodes.append(
-                {
-                    "id": node_name,
-                    "node_type": "water_node",
-                    "node_category": "Junction",
-                    "x": list(self.wn.get_node(node_name).coordinates)[0],
-                    "y": list(self.wn.get_node(node_name).coordinates)[1],
-                },
-                ignore_index=True,
-            )
-        for _, node_name in enumerate(water_tank_list):
-            water_nodes = water_nodes.append(
-                {
-                    "id": node_name,
-                    "node_type": "water_node",
-                    "node_category": "Tank",
-                    "x": list(self.wn.get_node(node_name).coordinates)[0],
-                    "y": list(self.wn.get_node(node_name).coordinates)[1],
-                },
-                ignore_index=True,
-            )
-        for _, node_name in enumerate(water_reserv_list):
-            water_nodes = water_nodes.append(
-                {
-                    "id": node_name,
-                    "node_type": "water_node",
-                    "node_category": "Reservoir",
-                    "x": list(self.wn.get_node(node_name).coordinates)[0],
-                    "y": list(self.wn.get_node(node_name).coordinates)[1],
-                },
-                ignore_index=True,
-            )
+        water_nodes = {"id": [], "node_category": [], "coord": []}
+        for node_category, node_list in [
+            ("Junction", self.wn.junction_name_list),
+            ("Tank", self.wn.tank_name_list),
+            ("Reservoir", self.wn.reservoir_name_list),
+        ]:
+            for node_name in node_list:
+                water_nodes["id"].append(node_name)
+                water_nodes["node_category"].append(node_category)
+                water_nodes["coord"].append(self.wn.get_node(node_name).coordinates)
 
         # water network links
-        water_links = pd.DataFrame(
-            columns=["id", "link_type", "link_category", "from", "to"]
-        )
-
-        water_pipe_name_list = self.wn.pipe_name_list
-        water_pump_name_list = self.wn.pump_name_list
-
-        for _, link_name in enumerate(water_pipe_name_list):
-            water_links = water_links.append(
-                {
-                    "id": link_name,
-                    "link_type": "Water",
-                    "link_category": "Water pipe",
-                    "from": self.wn.get_link(link_name).start_node_name,
-                    "to": self.wn.get_link(link_name).end_node_name,
-                },
-                ignore_index=True,
-            )
-        for _, link_name in enumerate(water_pump_name_list):
-            water_links = water_links.append(
-                {
-                    "id": link_name,
-                    "link_type": "Water",
-                    "link_category": "Water pump",
-                    "from": self.wn.get_link(link_name).start_node_name,
-                    "to": self.wn.get_link(link_name).end_node_name,
-                },
-                ignore_index=True,
+        water_coords = dict(zip(water_nodes["id"], water_nodes["coord"]))
+        for link_category, link_list in [
+            ("Water pipe", self.wn.pipe_name_list),
+            ("Water pump", self.wn.pump_name_list),
+        ]:
+            links = [self.wn.get_link(link_name) for link_name in link_list]
+            start_nodes = [link.start_node_name for link in links]
+            end_nodes = [link.end_node_name for link in links]
+            G_water.add_edges_from(
+                (
+                    start_node,
+                    end_node,
+                    {
+                        "id": link_name,
+                        "link_type": "Water",
+                        "link_category": link_category,
+                        "length": length,
+                    },
+                )
+                for link_name, start_node, end_node, length in zip(
+                    link_list,
+                    start_nodes,
+                    end_nodes,
+                    calculate_edge_lengths(water_coords, start_nodes, end_nodes),
+                )
             )
 
-        G_water = nx.from_pandas_edgelist(
-            water_links, source="from", target="to", edge_attr=True
+        nx.set_node_attributes(G_water, "water_node", "node_type")
+        nx.set_node_attributes(
+            G_water,
+            dict(zip(water_nodes["id"], water_nodes["node_category"])),
+            "node_category",
         )
-
-        for _, row in water_nodes.iterrows():
-            G_water.nodes[row["id"]]["node_type"] = row["node_type"]
-            G_water.nodes[row["id"]]["node_category"] = row["node_category"]
-            G_water.nodes[row["id"]]["coord"] = self.wn.get_node(row["id"]).coordinates
-
-        for graph in [G_water]:
-            for _, link in enumerate(graph.edges.keys()):
-                start_node, end_node = link
-                start_coords = graph.nodes[link[0]]["coord"]
-                end_coords = graph.nodes[link[1]]["coord"]
-                graph.edges[link]["length"] = round(
-                    math.sqrt(
-                        ((start_coords[0] - end_coords[0]) ** 2)
-                        + ((start_coords[1] - end_coords[1]) ** 2)
-                    ),
-                    3,
-                )
+        nx.set_node_attributes(G_water, water_coords, "coord")
 
         if plot == True:
-            pos = {node: G_water.nodes[node]["coord"] for node in water_nodes.id}
+            pos = {node: G_water.nodes[node]["coord"] for node in water_nodes["id"]}
             nx.draw(G_water, pos, node_size=1)
 
+        self._graph_cache["water"] = (version, G_water)
         return G_water
 
     def generate_transpo_networkx_graph(self, plot=False):
-        """Generates the transportation network as a networkx object.
+        """Generates the transportation network as a networkx object. The graph is cached and shared until invalidate_graph("transpo") is called, so it must not be modified by the caller.
 
         :param plot: To generate the network plot, defaults to False., defaults to False.
         :type plot: bool, optional
         :return: The transportation network as a networkx object.
         :rtype: Networkx object
         """
+        version = self._graph_versions["transpo"]
+        if not plot and self._graph_cache.get("transpo", (None,))[0] == version:
+            return self._graph_cache["transpo"][1]
+
         G_transpo = nx.Graph()
 
         # transportation network nodes
-        transpo_nodes = pd.DataFrame(
-            columns=["id", "node_type", "node_category", "x", "y"]
+        coords_map = dict(
+            zip(
+                self.tn.node_coords["Node"].tolist(),
+                zip(
+                    self.tn.node_coords["X"].tolist(), self.tn.node_coords["Y"].tolist()
+                ),
+            )
         )
 
         transpo_node_list = list(self.tn.node.keys())
-        for _, node_name in enumerate(list(transpo_node_list)):
-            transpo_nodes = transpo_nodes.append(
-                {
-                    "id": node_name,
-                    "node_type": "transpo_node",
-                    "node_category": "Junction",
-                    "x": self.tn.node_coords[
-                        self.tn.node_coords["Node"] == node_name
-                    ].X,
-                    "y": self.tn.node_coords[
-                        self.tn.node_coords["Node"] == node_name
-                    ].Y,
-                },
-                ignore_index=True,
-            )
 
         # transportation network links
-        transpo_links = pd.DataFrame(
-            columns=["id", "link_type", "link_category", "from", "to"]
-        )
         transpo_link_list = list(self.tn.link.keys())
-        for _, link_name in enumerate(list(transpo_link_list)):
-            transpo_links = transpo_links.append(
+        tails = [self.tn.link[link_name].tail for link_name in transpo_link_list]
+        heads = [self.tn.link[link_name].head for link_name in transpo_link_list]
+        G_transpo.add_edges_from(
+            (
+                tail,
+                head,
                 {
                     "id": link_name,
                     "link_type": "Transportation",
                     "link_category": "Road link",
-                    "from": self.tn.link[link_name].tail,
-                    "to": self.tn.link[link_name].head,
+                    "length": length,
                 },
-                ignore_index=True,
             )
-
-        G_transpo = nx.from_pandas_edgelist(
-            transpo_links,
-            source="from",
-            target="to",
-            edge_attr=True,
+            for link_name, tail, head, length in zip(
+                transpo_link_list,
+                tails,
+                heads,
+                calculate_edge_lengths(coords_map, tails, heads),
+            )
         )
 
-        for _, node_name in enumerate(transpo_node_list):
-            G_transpo.nodes[node_name]["node_type"] = "transpo_node"
-            G_transpo.nodes[node_name]["node_category"] = transpo_nodes[
-                transpo_nodes.id == node_name
-            ]["node_category"].item()
-            G_transpo.nodes[node_name]["coord"] = [
-                self.tn.node_coords[self.tn.node_coords["Node"] == node_name].X.item(),
-                self.tn.node_coords[self.tn.node_coords["Node"] == node_name].Y.item(),
-            ]
-
-        for graph in [G_transpo]:
-            for _, link in enumerate(graph.edges.keys()):
-                start_node, end_node = link
-                start_coords = graph.nodes[link[0]]["coord"]
-                end_coords = graph.nodes[link[1]]["coord"]
-                graph.edges[link]["length"] = round(
-                    math.sqrt(
-                        ((start_coords[0] - end_coords[0]) ** 2)
-                        + ((start_coords[1] - end_coords[1]) ** 2)
-                    ),
-                    3,
-                )
+        nx.set_node_attributes(G_transpo, "transpo_node", "node_type")
+        nx.set_node_attributes(G_transpo, "Junction", "node_category")
+        nx.set_node_attributes(
+            G_transpo,
+            {node_name: list(coords_map[node_name]) for node_name in transpo_node_list},
+            "coord",
+        )
 
         if plot == True:
-            pos = {node: G_transpo.nodes[node]["coord"] for node in transpo_nodes.id}
+            pos = {node: G_transpo.nodes[node]["coord"] for node in transpo_node_list}
             nx.draw(G_transpo, pos, node_size=1)
 
+        self._graph_cache["transpo"] = (version, G_transpo)
         return G_transpo
 
     def generate_dependency_table(self, dependency_file):
@@ -604,7 +683,20 @@ class IntegratedNetwork:
         :type scenario_file: string
         """
         try:
-            self.disruptive_events = pd.read_csv(scenario_file, sep=",")
+            disruptive_events = pd.read_csv(
+                scenario_file,
+                sep=",",
+                usecols=["time_stamp", "components", "fail_perc"],
+                dtype={"components": str},
+                na_filter=False,
+            )
+            disruptive_events = disruptive_events[
+                disruptive_events["components"] != ""
+            ].reset_index(drop=True)
+            disruptive_events["time_stamp"] = pd.to_numeric(
+                disruptive_events["time_stamp"]
+            ).astype("int64")
+            self.disruptive_events = disruptive_events
         except FileNotFoundError:
             print(
                 "Error: The scenario file does not exist. No such directory: ",
@@ -613,21 +705,20 @@ class IntegratedNetwork:
         self.disrupted_components = self.disruptive_events.components
         self.set_disrupted_infra_dict()
 
-        self.disruption_time_dict = {}  # self.disruptive_events["time_stamp"].min()
-
-        power_list = self.disrupted_infra_dict["power"]
-        water_list = self.disrupted_infra_dict["water"]
-        transpo_list = self.disrupted_infra_dict["transpo"]
-
-        self.disruption_time_dict["power"] = self.disruptive_events[
-            self.disruptive_events["components"].isin(power_list)
-        ]["time_stamp"].min()
-        self.disruption_time_dict["water"] = self.disruptive_events[
-            self.disruptive_events["components"].isin(water_list)
-        ]["time_stamp"].min()
-        self.disruption_time_dict["transpo"] = self.disruptive_events[
-            self.disruptive_events["components"].isin(transpo_list)
-        ]["time_stamp"].min()
+        compon_infra_dict = {
+            component: infra
+            for infra, compon_list in self.disrupted_infra_dict.items()
+            for component in compon_list
+        }
+        disruption_times = (
+            self.disruptive_events["time_stamp"]
+            .groupby(self.disruptive_events["components"].map(compon_infra_dict))
+            .min()
+        )
+        self.disruption_time_dict = {
+            infra: disruption_times.get(infra, np.nan)
+            for infra in ["power", "water", "transpo"]
+        }
 
     def get_disruptive_events(self):
         """Returns the disruptive event data
@@ -646,20 +737,17 @@ class IntegratedNetwork:
         return list(self.disrupted_components)
 
     def set_disrupted_infra_dict(self):
-        """Sets the disrupted infrastructure components dictionary with infrastructure type as keys."""
+        """Sets the disrupted infrastructure components dictionary with infrastructure type as keys, and the list of disrupted pipes."""
         disrupted_infra_dict = {"power": [], "water": [], "transpo": []}
-        for _, component in enumerate(self.disrupted_components):
-            # print(component)
+        disrupted_pipes = []
+        for component in self.disrupted_components:
             compon_details = interdependencies.get_compon_details(component)
-            # print(compon_details)
-
-            if compon_details[0] == "power":
-                disrupted_infra_dict["power"].append(component)
-            elif compon_details[0] == "water":
-                disrupted_infra_dict["water"].append(component)
-            elif compon_details[0] == "transpo":
-                disrupted_infra_dict["transpo"].append(component)
+            if compon_details[0] in disrupted_infra_dict:
+                disrupted_infra_dict[compon_details[0]].append(component)
+            if compon_details[3] in PIPE_TYPES:
+                disrupted_pipes.append(component)
         self.disrupted_infra_dict = disrupted_infra_dict
+        self.disrupted_pipes = disrupted_pipes
 
     def get_disrupted_infra_dict(self):
         """Returns the  disrupted infrastructure components dictionary.
@@ -691,58 +779,40 @@ class IntegratedNetwork:
         self.water_crews = {}
         self.transpo_crews = {}
 
-        try:
-            for i in range(len(init_power_crew_locs)):
-                crew_size = None if power_crews_size is None else power_crews_size[i]
-                self.power_crews[i + 1] = repair_crews.PowerRepairCrew(
-                    name=i + 1,
-                    init_loc=init_power_crew_locs[i],
-                    crew_size=crew_size,
-                )
-                self.power_crews[i + 1].set_next_trip_start(
-                    self.disruption_time_dict["power"]
-                )
-            print("Power repair crews successfully deployed.")
-        except TypeError:
-            print(
-                "TypeError: The initial locations of the power crews are not specified or not valid."
+        if init_power_crew_locs is None:
+            print("The initial locations of the power crews are not specified.")
+        else:
+            self.power_crews = create_repair_crews(
+                repair_crews.PowerRepairCrew,
+                init_power_crew_locs,
+                power_crews_size,
+                self.disruption_time_dict["power"],
             )
+            print("Power repair crews successfully deployed.")
 
-        try:
-            for i in range(len(init_water_crew_locs)):
-                crew_size = None if water_crews_size is None else water_crews_size[i]
-                self.water_crews[i + 1] = repair_crews.WaterRepairCrew(
-                    name=i + 1,
-                    init_loc=init_water_crew_locs[i],
-                    crew_size=crew_size,
-                )
-                self.water_crews[i + 1].set_next_trip_start(
-                    self.disruption_time_dict["water"]
-                )
-            print("Water repair crews successfully deployed.")
-        except TypeError:
-            print(
-                "TypeError: The initial locations of the water crews are not specified or not valid."
+        if init_water_crew_locs is None:
+            print("The initial locations of the water crews are not specified.")
+        else:
+            self.water_crews = create_repair_crews(
+                repair_crews.WaterRepairCrew,
+                init_water_crew_locs,
+                water_crews_size,
+                self.disruption_time_dict["water"],
             )
+            print("Water repair crews successfully deployed.")
 
-        try:
-            for i in range(len(init_transpo_crew_locs)):
-                crew_size = (
-                    None if transpo_crews_size is None else transpo_crews_size[i]
-                )
-                self.transpo_crews[i + 1] = repair_crews.TranspoRepairCrew(
-                    name=i + 1,
-                    init_loc=init_transpo_crew_locs[i],
-                    crew_size=crew_size,
-                )
-                self.transpo_crews[i + 1].set_next_trip_start(
-                    self.disruption_time_dict["transpo"]
-                )
-            print("Transportation repair crews successfully deployed.")
-        except TypeError:
+        if init_transpo_crew_locs is None:
             print(
-                "TypeError: The initial locations of the transportation crews are not specified or not valid."
+                "The initial locations of the transportation crews are not specified."
             )
+        else:
+            self.transpo_crews = create_repair_crews(
+                repair_crews.TranspoRepairCrew,
+                init_transpo_crew_locs,
+                transpo_crews_size,
+                self.disruption_time_dict["transpo"],
+            )
+            print("Transportation repair crews successfully deployed.")
 
     def get_idle_crew(self, crew_type):
         """Returns the idle crew of the given type.
@@ -752,34 +822,18 @@ class IntegratedNetwork:
         :return: The idle crew of the given type.
         :rtype: repair_crews.RepairCrew
         """
-        if crew_type == "power":
-            crews = self.power_crews
-
-            idle_crew = crews[list(crews.keys())[0]]
-            for crew_name in crews.keys():
-                if crews[crew_name].next_trip_start < idle_crew.next_trip_start:
-                    idle_crew = crews[crew_name]
-            return idle_crew
-        elif crew_type == "water":
-            crews = self.water_crews
-            idle_crew = crews[list(crews.keys())[0]]
-            for crew_name in crews.keys():
-                if crews[crew_name].next_trip_start < idle_crew.next_trip_start:
-                    idle_crew = crews[crew_name]
-            return idle_crew
-        elif crew_type == "transpo":
-            crews = self.transpo_crews
-            idle_crew = crews[list(crews.keys())[0]]
-            for crew_name in crews.keys():
-                if crews[crew_name].next_trip_start < idle_crew.next_trip_start:
-                    idle_crew = crews[crew_name]
-            return idle_crew
+        crews = {
+            "power": self.power_crews,
+            "water": self.water_crews,
+            "transpo": self.transpo_crews,
+        }[crew_type]
+        return min(crews.values(), key=attrgetter("next_trip_start"))
 
     def reset_crew_locs(self):
         """Resets the location of infrastructure crews."""
         for crew_type in [self.power_crews, self.water_crews, self.transpo_crews]:
-            for crew in crew_type.keys():
-                crew_type[crew].reset_locs()
+            for crew in crew_type.values():
+                crew.reset_locs()
 
     def set_power_crew_loc(self, power_crew_loc):
         """Sets the location of the power crew.
@@ -787,7 +841,7 @@ class IntegratedNetwork:
         :param power_crew_loc: The name of the location (transportation  node)
         :type power_crew_loc: string
         """
-        self.power_crew_loc = power_crew_loc
+        self.power_crew_loc = intern_name(power_crew_loc)
 
     def set_water_crew_loc(self, water_crew_loc):
         """Sets the location of the water crew.
@@ -795,7 +849,7 @@ class IntegratedNetwork:
         :param water_crew_loc: The name of the location (transportation  node)
         :type water_crew_loc: string
         """
-        self.water_crew_loc = water_crew_loc
+        self.water_crew_loc = intern_name(water_crew_loc)
 
     def set_transpo_crew_loc(self, transpo_crew_loc):
         """Sets the location of the transportation crew.
@@ -803,7 +857,7 @@ class IntegratedNetwork:
         :param transpo_crew_loc: The name of the location (transportation  node)
         :type transpo_crew_loc: string
         """
-        self.transpo_crew_loc = transpo_crew_loc
+        self.transpo_crew_loc = intern_name(transpo_crew_loc)
 
     def get_power_crew_loc(self):
         """Returns the current power crew location.
@@ -830,34 +884,148 @@ class IntegratedNetwork:
         return self.transpo_crew_loc
 
     def pipe_leak_node_generator(self):
-        """Splits the directly affected pipes to induce leak during simulations."""
+        """Splits the directly affected pipes to induce leak during simulations. The water network model is modified in place: it is created by load_water_network and owned by this object, and NetworkRecovery only splits the pipes of its own deep copy of the integrated network, so the base network passed to it is not modified."""
+        if len(self.disrupted_pipes) == 0:
+            return
 
-        for _, component in enumerate(self.get_disrupted_components()):
-            compon_details = interdependencies.get_compon_details(component)
-            if compon_details[3] in [
-                "Pipe",
-                "Service Connection Pipe",
-                "Main Pipe",
-                "Hydrant Connection Pipe",
-                "Valve converted to Pipe",
-            ]:
-                self.wn = wntr.morph.split_pipe(
-                    self.wn,
-                    component,
-                    f"{component}_B",
-                    f"{component}_leak_node",
-                )
+        split_pipes(self.wn, self.disrupted_pipes)
+        self.invalidate_graph("water")
 
     def get_node_link_dict(self):
-        node_link_dict = {
-            "water": {
-                "node": ["R", "J", "JIN", "JVN", "JTN", "JHY", "T"],
-                "link": ["P", "PSC", "PMA", "PHC", "PV", "WP"],
-            },
-            "power": {
-                "node": ["B", "BL", "BS", "LO", "MP", "AL", "AS", "G"],
-                "link": ["S", "L", "LS", "TF", "TH", "I", "DL"],
-            },
-            "transpo": {"node": ["J"], "link": ["L"]},
-        }
-        return node_link_dict
+        """Returns the component type codes of the nodes and links in each infrastructure.
+
+        :return: The node and link type codes of each infrastructure.
+        :rtype: read-only dictionary of frozensets
+        """
+        return NODE_LINK_DICT
+
+    def get_compon_role_dict(self):
+        """Returns whether each component type code is a node or a link, per infrastructure. The lookup is per infrastructure since some codes (e.g., "J" and "L") are used in more than one infrastructure.
+
+        :return: The role ("node" or "link") of each component type code in each infrastructure.
+        :rtype: read-only dictionary of dictionaries
+        """
+        return COMPON_ROLE_DICT
+
+
+def read_service_area(shapefile):
+    """Reads a service area shapefile (in EPSG:4326 unless the file says otherwise) and projects it to EPSG:3857. The file is read with pyogrio when it is installed, and with fiona otherwise.
+
+    :param shapefile: The location of the service area shapefile.
+    :type shapefile: string
+    :return: The service area polygons.
+    :rtype: geopandas GeoDataFrame
+    """
+    if pyogrio is not None:
+        service_area = pyogrio.read_dataframe(shapefile)
+        if service_area.crs is None:
+            service_area = service_area.set_crs("epsg:4326")
+    else:
+        service_area = gpd.read_file(shapefile, crs={"init": "epsg:4326"})
+    return service_area.to_crs({"init": "epsg:3857"})
+
+
+def intern_name(name):
+    """Interns a component or node name so that equal names share one string object. Names that are not strings, such as integer node ids, are returned unchanged.
+
+    :param name: The name to be interned.
+    :type name: string/integer
+    :return: The interned name.
+    :rtype: string/integer
+    """
+    if isinstance(name, str):
+        return sys.intern(name)
+    return name
+
+
+def split_pipes(wn, pipes_to_split):
+    """Splits the given pipes at their midpoints. The water network model is modified in place, so it must not be shared with objects that expect the unsplit model; pass a deep copy otherwise.
+
+    :param wn: Water network object.
+    :type wn: wntr network object
+    :param pipes_to_split: The names of the pipes to be split.
+    :type pipes_to_split: list of strings
+    """
+    split_names = [(pipe, pipe + "_B", pipe + "_leak_node") for pipe in pipes_to_split]
+    for pipe, new_pipe, leak_node in split_names:
+        wntr.morph.split_pipe(wn, pipe, new_pipe, leak_node, return_copy=False)
+
+
+def create_repair_crews(crew_class, init_crew_locs, crews_size, trip_start):
+    """Creates the repair crews of one infrastructure, numbered from 1.
+
+    :param crew_class: The repair crew class of the infrastructure.
+    :type crew_class: class
+    :param init_crew_locs: Initial locations (nearest transportation nodes) of the crews.
+    :type init_crew_locs: list of strings
+    :param crews_size: The sizes of the crews. If None, the default crew size is used.
+    :type crews_size: list of integers
+    :param trip_start: The time from which the crews can start their first trip.
+    :type trip_start: integer
+    :return: The repair crews with crew numbers as keys.
+    :rtype: dictionary
+    """
+    crews = {}
+    for i, init_loc in enumerate(init_crew_locs):
+        crew_size = None if crews_size is None else crews_size[i]
+        crews[i + 1] = crew_class(name=i + 1, init_loc=init_loc, crew_size=crew_size)
+        crews[i + 1].set_next_trip_start(trip_start)
+    return crews
+
+
+def calculate_edge_lengths(node_coords, start_nodes, end_nodes):
+    """Calculates the Euclidean distance (rounded to three decimals) between the start and end nodes of each edge.
+
+    :param node_coords: The coordinates of the nodes.
+    :type node_coords: dictionary with node names as keys and (x, y) as values
+    :param start_nodes: The start nodes of the edges.
+    :type start_nodes: list of strings
+    :param end_nodes: The end nodes of the edges.
+    :type end_nodes: list of strings
+    :return: The lengths of the edges.
+    :rtype: list of floats
+    """
+    start_coords = np.array(
+        [node_coords[node] for node in start_nodes], dtype=float
+    ).reshape(-1, 2)
+    end_coords = np.array(
+        [node_coords[node] for node in end_nodes], dtype=float
+    ).reshape(-1, 2)
+    lengths = np.hypot(
+        start_coords[:, 0] - end_coords[:, 0], start_coords[:, 1] - end_coords[:, 1]
+    )
+    return np.round(lengths, 3).tolist()
+
+
+def calculate_betweenness_centrality(graph, k=None, seed=None):
+    """Calculates the normalized node and edge betweenness centrality of a graph. The exact values are computed in parallel with networkit when it is installed, and with networkx otherwise.
+
+    :param graph: The undirected graph.
+    :type graph: Networkx object
+    :param k: The number of source nodes sampled to approximate the betweenness centrality (using networkx), defaults to None (exact betweenness centrality)
+    :type k: integer, optional
+    :param seed: The seed of the random source node sampling, defaults to None
+    :type seed: integer, optional
+    :return: The node and edge betweenness centrality dictionaries.
+    :rtype: tuple of dictionaries
+    """
+    if k is not None or nk is None:
+        node_bc = nx.betweenness_centrality(graph, k=k, normalized=True, seed=seed)
+        edge_bc = nx.edge_betweenness_centrality(graph, k=k, normalized=True, seed=seed)
+        return node_bc, edge_bc
+
+    node_names = list(graph.nodes())
+    nk_graph = nk.nxadapter.nx2nk(graph)
+    nk_graph.indexEdges()
+    betweenness = nk.centrality.Betweenness(
+        nk_graph, normalized=True, computeEdgeCentrality=True
+    )
+    betweenness.run()
+
+    node_bc = dict(zip(node_names, betweenness.scores()))
+    edge_scores = betweenness.edgeScores()
+    edge_bc = {
+        (node_names[u], node_names[v]): edge_scores[nk_graph.edgeId(u, v)]
+        for u, v in nk_graph.iterEdges()
+    }
+    return node_bc, edge_bc
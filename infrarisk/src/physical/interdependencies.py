@@ -1,5 +1,8 @@
 """Classes and functions to manage dependencies in the integrated infrastructure network."""
 
+from functools import lru_cache
+import weakref
+import numpy as np
 import pandas as pd
 from scipy import spatial
 import infrarisk.src.physical.water.water_network_model as water
@@ -10,6 +13,15 @@ water_dict = water.get_water_dict()
 power_dict = power.get_power_dict()
 transpo_dict = transpo_compons.get_transpo_dict()
 
+node_kdtree_cache = weakref.WeakKeyDictionary()
+power_name_index_cache = dict()
+
+coupling_method_dict = {
+    ("Pump", "Motor"): "add_pump_motor_coupling",
+    ("Pump", "Motor as Load"): "add_pump_loadmotor_coupling",
+    ("Reservoir", "Generator"): "add_gen_reserv_coupling",
+}
+
 # ---------------------------------------------------------------------------- #
 #                      DEPENDENCY TABLE CLASS AND METHODS                      #
 # ---------------------------------------------------------------------------- #
@@ -18,18 +30,40 @@ class DependencyTable:
 
     def __init__(self):
         """Initiates an empty dataframe to store node-to-node dependencies."""
-        self.wp_table = pd.DataFrame(
-            columns=["water_id", "power_id", "water_type", "power_type"]
-        )
-        self.access_table = pd.DataFrame(
-            columns=[
-                "origin_id",
-                "transp_id",
-                "origin_cat",
-                "origin_type",
-                "access_dist",
-            ]
-        )
+        self.wp_columns = ["water_id", "power_id", "water_type", "power_type"]
+        self.access_columns = [
+            "origin_id",
+            "transp_id",
+            "origin_cat",
+            "origin_type",
+            "access_dist",
+        ]
+        self._wp_rows = []
+        self._wp_table = pd.DataFrame(columns=self.wp_columns)
+        self.access_table = pd.DataFrame(columns=self.access_columns)
+
+    @property
+    def wp_table(self):
+        """The water-power dependency table. The dependency entries created since the table was last accessed are added to it in one step.
+
+        :return: The water-power dependency table.
+        :rtype: pandas dataframe
+        """
+        if len(self._wp_rows) > 0:
+            new_rows = pd.DataFrame(self._wp_rows, columns=self.wp_columns)
+            if len(self._wp_table) == 0:
+                self._wp_table = new_rows
+            else:
+                self._wp_table = pd.concat(
+                    [self._wp_table, new_rows], ignore_index=True
+                )
+            self._wp_rows.clear()
+        return self._wp_table
+
+    @wp_table.setter
+    def wp_table(self, wp_table):
+        self._wp_table = wp_table
+        self._wp_rows.clear()
 
     def build_power_water_dependencies(self, dependency_file):
         """Adds the power-water dependency table to the DependencyTable object.
@@ -39,29 +73,14 @@ class DependencyTable:
         """
         try:
             dependency_data = pd.read_csv(dependency_file, sep=",")
-            for _, row in dependency_data.iterrows():
-                water_id = row["water_id"]
-                power_id = row["power_id"]
-
-                water_details = get_compon_details(water_id)
-                power_details = get_compon_details(power_id)
-
-                if (power_details[3] == "Motor") & (water_details[3] == "Pump"):
-                    self.add_pump_motor_coupling(
-                        water_id=water_id,
-                        power_id=power_id,
-                    )
-                elif (power_details[3] == "Motor as Load") & (
-                    water_details[3] == "Pump"
-                ):
-                    self.add_pump_loadmotor_coupling(
-                        water_id=water_id,
-                        power_id=power_id,
-                    )
-                elif (water_details[3] == "Reservoir") & (
-                    power_details[3] == "Generator"
-                ):
-                    self.add_gen_reserv_coupling(
+            for water_id, power_id in zip(
+                dependency_data["water_id"], dependency_data["power_id"]
+            ):
+                coupling_method = coupling_method_dict.get(
+                    (get_compon_details(water_id)[3], get_compon_details(power_id)[3])
+                )
+                if coupling_method is not None:
+                    getattr(self, coupling_method)(
                         water_id=water_id,
                         power_id=power_id,
                     )
@@ -91,14 +110,13 @@ class DependencyTable:
         :param power_id: The name of the motor in the power systems model.
         :type power_id: string
         """
-        self.wp_table = self.wp_table.append(
+        self._wp_rows.append(
             {
                 "water_id": water_id,
                 "power_id": power_id,
                 "water_type": "Pump",
                 "power_type": "Motor",
-            },
-            ignore_index=True,
+            }
         )
 
     def add_pump_loadmotor_coupling(self, water_id, power_id):
@@ -109,14 +127,13 @@ class DependencyTable:
         :param power_id: The name of the motor (modeled as load in three phase pandapower networks) in the power systems model.
         :type power_id: string
         """
-        self.wp_table = self.wp_table.append(
+        self._wp_rows.append(
             {
                 "water_id": water_id,
                 "power_id": power_id,
                 "water_type": "Pump",
                 "power_type": "Motor as Load",
-            },
-            ignore_index=True,
+            }
         )
 
     def add_gen_reserv_coupling(self, water_id, power_id):
@@ -127,14 +144,13 @@ class DependencyTable:
         :param power_id: The name of the generator in the power systems model.
         :type power_id: string
         """
-        self.wp_table = self.wp_table.append(
+        self._wp_rows.append(
             {
                 "water_id": water_id,
                 "power_id": power_id,
                 "water_type": "Reservoir",
                 "power_type": "Generator",
-            },
-            ignore_index=True,
+            }
         )
 
     def add_transpo_access(self, integrated_graph):
@@ -143,28 +159,29 @@ class DependencyTable:
         :param integrated_graph: The integrated network as networkx object.
         :type integrated_graph: [networkx object]
         """
-        nodes_of_interest = [
-            x
-            for x, y in integrated_graph.nodes(data=True)
-            if y["node_type"] == "power_node" or y["node_type"] == "water_node"
-        ]
-        for node in nodes_of_interest:
-            comp_details = get_compon_details(node)
-            near_node, near_dist = get_nearest_node(
-                integrated_graph,
-                node,
-                "transpo_node",
-            )
-            self.access_table = self.access_table.append(
+        nodes_of_interest = []
+        coords_of_interest = []
+        for node, node_data in integrated_graph.nodes(data=True):
+            if node_data["node_type"] in ["power_node", "water_node"]:
+                nodes_of_interest.append(node)
+                coords_of_interest.append(node_data["coord"])
+
+        if len(nodes_of_interest) > 0:
+            transpo_nodes, tree = get_node_kdtree(integrated_graph, "transpo_node")
+            near_dists, near_indices = tree.query(coords_of_interest, workers=-1)
+            compon_details = [get_compon_details(node) for node in nodes_of_interest]
+            self.access_table = pd.DataFrame(
                 {
-                    "origin_id": node,
-                    "transp_id": near_node,
-                    "origin_cat": comp_details[0],
-                    "origin_type": comp_details[3],
-                    "access_dist": near_dist,
+                    "origin_id": nodes_of_interest,
+                    "transp_id": [transpo_nodes[i] for i in near_indices.tolist()],
+                    "origin_cat": [details[0] for details in compon_details],
+                    "origin_type": [details[3] for details in compon_details],
+                    "access_dist": np.round(near_dists, 2),
                 },
-                ignore_index=True,
+                columns=self.access_columns,
             )
+        else:
+            self.access_table = pd.DataFrame(columns=self.access_columns)
 
     def update_dependencies(self, network, time_stamp, next_time_stamp):
         """Updates the operational performance of all the dependent components in the integrated network.
@@ -181,58 +198,61 @@ class DependencyTable:
         # )
 
         # print(network.wn.control_name_list)
-        for _, row in self.wp_table.iterrows():
-            if (row.water_type == "Pump") & (row.power_type == "Motor"):
-                pump_index = network.pn.motor[
-                    network.pn.motor.name == row.power_id
-                ].index.item()
-                if network.pn.res_motor.iloc[pump_index].p_mw == 0:
-                    if (
-                        f"{row.water_id}_power_off_{time_stamp}"
-                        in network.wn.control_name_list
-                    ):
-                        network.wn.remove_control(
-                            f"{row.water_id}_power_off_{time_stamp}"
-                        )
-                    if (
-                        f"{row.water_id}_power_on_{next_time_stamp}"
-                        in network.wn.control_name_list
-                    ):
-                        network.wn.remove_control(
-                            f"{row.water_id}_power_on_{next_time_stamp}"
-                        )
-
-                    pump = network.wn.get_link(row.water_id)
-
-                    if f"{row.water_id}_outage" in network.wn.control_name_list:
-                        network.wn.remove_control(f"{row.water_id}_outage")
-                    pump.add_outage(
-                        network.wn,
-                        time_stamp,
-                        next_time_stamp,
-                    )
-                    # print(
-                    #     f"Pump outage resulting from electrical motor failure is added for {row.water_id} between {time_stamp} s and {next_time_stamp} s"
-                    # )
+        is_pump_motor = (self.wp_table.water_type == "Pump") & (
+            self.wp_table.power_type == "Motor"
+        )
+        pump_motors = self.wp_table.loc[is_pump_motor, ["water_id", "power_id"]]
+        if pump_motors.empty:
+            return
+
+        motor_name_to_index = dict(
+            zip(network.pn.motor.name.to_numpy(), network.pn.motor.index.to_numpy())
+        )
+        motor_indices = np.array(
+            [motor_name_to_index[power_id] for power_id in pump_motors.power_id],
+            dtype=np.int64,
+        )
+        p_mw = network.pn.res_motor["p_mw"].to_numpy()
+        offline = p_mw[motor_indices] == 0
+
+        control_names = set(network.wn.control_name_list)
+        for water_id in pump_motors.water_id.to_numpy()[offline]:
+            for control_name in (
+                f"{water_id}_power_off_{time_stamp}",
+                f"{water_id}_power_on_{next_time_stamp}",
+                f"{water_id}_outage",
+            ):
+                if control_name in control_names:
+                    network.wn.remove_control(control_name)
+                    control_names.discard(control_name)
+
+            pump = network.wn.get_link(water_id)
+            pump.add_outage(
+                network.wn,
+                time_stamp,
+                next_time_stamp,
+            )
+            control_names.add(f"{water_id}_outage")
+            # print(
+            #     f"Pump outage resulting from electrical motor failure is added for {water_id} between {time_stamp} s and {next_time_stamp} s"
+            # )
 
 
 # ---------------------------------------------------------------------------- #
 #                            MISCELLANEOUS FUNCTIONS                           #
 # ---------------------------------------------------------------------------- #
+@lru_cache(maxsize=None)
 def get_compon_details(compon_name):
-    """Fetches the infrastructure type, component type, component code and component actual name.
+    """Fetches the infrastructure type, component type, component code and component actual name. The details are cached per component name.
 
     :param compon_name: Name of the component.
     :type compon_name: string
     :return: Infrastructure type, component type, component code and component actual name.
-    :rtype: list of strings
+    :rtype: tuple of strings
     """
     compon_infra, compon_id = compon_name.split("_")
     # print(compon_infra, compon_id)
-    compon_type = ""
-    for char in compon_id:
-        if char.isalpha():
-            compon_type = "".join([compon_type, char])
+    compon_type = "".join(filter(str.isalpha, compon_id))
     if compon_infra == "P":
         if compon_type in power_dict.keys():
             return (
@@ -289,21 +309,49 @@ def get_nearest_node(integrated_graph, connected_node, target_type):
     :return: Nearest node belonging to target type and the distance in meters.
     :rtype: list
     """
-    curr_node_loc = integrated_graph.nodes[connected_node]["coord"]
-    nodes_of_interest = [
-        x for x, y in integrated_graph.nodes(data=True) if y["node_type"] == target_type
-    ]
-    coords_of_interest = [
-        y["coord"]
-        for x, y in integrated_graph.nodes(data=True)
-        if y["node_type"] == target_type
-    ]
+    curr_node_data = integrated_graph.nodes[connected_node]
+    if curr_node_data["node_type"] == target_type:
+        return connected_node, 0.0
 
-    tree = spatial.KDTree(coords_of_interest)
-    dist_nearest = tree.query([curr_node_loc])[0][0]
-    nearest_node = nodes_of_interest[tree.query([curr_node_loc])[1][0]]
+    curr_node_loc = curr_node_data["coord"]
+    nodes_of_interest, tree = get_node_kdtree(integrated_graph, target_type)
+    dist_nearest, nearest_index = tree.query([curr_node_loc])
+    nearest_node = nodes_of_interest[nearest_index[0]]
 
-    return nearest_node, round(dist_nearest, 2)
+    return nearest_node, round(dist_nearest[0], 2)
+
+
+def get_node_kdtree(integrated_graph, target_type):
+    """Returns the nodes belonging to a specific family and a KD-tree of their coordinates. The nodes of all families are indexed in one pass over the graph, and the index and trees are cached per graph and graph version (the "version" graph attribute, set by IntegratedNetwork.generate_integrated_graph). Code that adds, moves or renames the nodes of a graph in place must change its version.
+
+    :param integrated_graph: The integrated network in networkx format.
+    :type integrated_graph: netwrokx object
+    :param target_type: The type of the nodes (power_node, transpo_node, water_node)
+    :type target_type: string
+    :return: The names of the nodes of the target type and the KD-tree of their coordinates, in the same order.
+    :rtype: list of strings, scipy KDTree object
+    """
+    graph_version = integrated_graph.graph.get("version")
+    graph_index = node_kdtree_cache.get(integrated_graph)
+    if graph_index is None or graph_index[0] != graph_version:
+        nodes_by_type = dict()
+        for node, node_data in integrated_graph.nodes(data=True):
+            type_nodes, type_coords = nodes_by_type.setdefault(
+                node_data["node_type"], ([], [])
+            )
+            type_nodes.append(node)
+            type_coords.append(node_data["coord"])
+        graph_index = (graph_version, nodes_by_type, dict())
+        node_kdtree_cache[integrated_graph] = graph_index
+
+    nodes_by_type, graph_trees = graph_index[1], graph_index[2]
+    if target_type not in graph_trees:
+        nodes_of_interest, coords_of_interest = nodes_by_type.get(target_type, ([], []))
+        graph_trees[target_type] = (
+            nodes_of_interest,
+            spatial.KDTree(coords_of_interest),
+        )
+    return graph_trees[target_type]
 
 
 def find_connected_power_node(component, pn):
@@ -323,16 +371,49 @@ def find_connected_power_node(component, pn):
     else:
         near_node_fields = power_dict[compon_details[1]]["connect_field"]
         connected_buses = []
+        compon_table = pn[compon_details[2]]
+        compon_position = get_power_name_index(pn, compon_details[2])[component]
         for near_node_field in near_node_fields:
-            bus_index = (
-                pn[compon_details[2]]
-                .query('name == "{}"'.format(component))[near_node_field]
-                .item()
-            )
-            connected_buses.append(pn.bus.iloc[bus_index]["name"])
+            bus_index = compon_table[near_node_field].iat[compon_position]
+            connected_buses.append(pn.bus["name"].iat[bus_index])
     return connected_buses
 
 
+def get_power_name_index(pn, table_name):
+    """Returns a mapping from the names of the elements in a pandapower table to their row positions. The mapping is cached per network and table, and is rebuilt when the table is replaced or its number of rows changes. Code that renames or reorders the elements of a table in place must replace the table.
+
+    :param pn: The power network.
+    :type pn: pandapower network object
+    :param table_name: The name of the element table (bus, load, motor, etc.)
+    :type table_name: string
+    :return: The row position of each element, with element names as keys.
+    :rtype: dictionary
+    """
+    # pandapower networks are unhashable dictionaries, so the cache is keyed by
+    # id. The weak reference detects a reused id and drops the entry once the
+    # network is garbage collected.
+    cached = power_name_index_cache.get(id(pn))
+    if cached is None or cached[0]() is not pn:
+        cached = (
+            weakref.ref(
+                pn, lambda _, key=id(pn): power_name_index_cache.pop(key, None)
+            ),
+            dict(),
+        )
+        power_name_index_cache[id(pn)] = cached
+    network_indices = cached[1]
+
+    compon_table = pn[table_name]
+    if table_name in network_indices:
+        cached_table, num_rows, name_index = network_indices[table_name]
+        if cached_table is compon_table and num_rows == len(compon_table):
+            return name_index
+
+    name_index = {name: i for i, name in enumerate(compon_table["name"].tolist())}
+    network_indices[table_name] = (compon_table, len(compon_table), name_index)
+    return name_index
+
+
 def find_connected_water_node(component, wn):
     """Finds the water network node to which the water component is connected to.
 
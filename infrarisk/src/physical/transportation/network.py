@@ -1,9 +1,10 @@
 import infrarisk.src.physical.transportation.utils as utils
 import infrarisk.src.physical.transportation.transpo_compons as transpo_compons
 
-import copy
+import collections
 import datetime
 
+import numpy as np
 import pandas as pd
 
 import sys
@@ -11,6 +12,7 @@ import traceback
 import re
 
 FRANK_WOLFE_STEPSIZE_PRECISION = 1e-4
+CONJUGATE_FRANK_WOLFE_DELTA = 1e-4
 
 
 class BadNetworkOperationException(Exception):
@@ -36,7 +38,8 @@ class Network:
 
        The network topology is expressed both in links (through the tail and head
        nodes) and in nodes (forwardStar and reverseStar are Node attributes storing
-       the IDs of entering and leaving links in a list).
+       the IDs of leaving and entering links in an array; these are views into
+       the compressed star arrays built in finalize).
 
        numNodes, numLinks, numZones -- self-explanatory
        firstThroughNode -- in the TNTP data format, transiting through nodes with
@@ -62,6 +65,15 @@ class Network:
         self.ODpair = dict()
         self.path = dict()
 
+        # Incremented whenever link costs change (see invalidateCostCaches);
+        # shortest path trees computed at the current costs are memoized by
+        # origin.
+        self._costVersion = 0
+        self._shortestPathVersion = 0
+        self._shortestPathCache = dict()
+        self._costArrayVersion = 0
+        self._pathIndex = None
+
         if len(networkFile) > 0 and len(demandFile) > 0:
             self.readFromFiles(networkFile, demandFile)
 
@@ -75,16 +87,14 @@ class Network:
         To do this, you will need to calculate both the total system travel time, and
         the shortest path travel time (you will find it useful to call some of the
         methods implemented in earlier assignments).
-        """
-        shortPathTT = 0
-        totSysTT = 0
 
-        for i in self.link:
-            totSysTT = totSysTT + self.link[i].flow * self.link[i].cost
-
-        allOrNothing = self.allOrNothing()
-        for i in allOrNothing:
-            shortPathTT = shortPathTT + allOrNothing[i] * self.link[i].cost
+        The flows and costs are read from the Link objects, so the result is
+        also correct after setting link.flow and calling link.updateCost.
+        """
+        flow = self._linkAttributeArray("flow")
+        cost = self._linkCostArray()
+        totSysTT = np.dot(flow, cost)
+        shortPathTT = np.dot(self._linkArray(self.allOrNothing()), cost)
 
         rel_gap = (totSysTT / shortPathTT) - 1
         return rel_gap
@@ -98,16 +108,14 @@ class Network:
         To do this, you will need to calculate both the total system travel time, and
         the shortest path travel time (you will find it useful to call some of the
         methods implemented in earlier assignments).
-        """
-        shortPathTT = 0
-        totSysTT = 0
-
-        for i in self.link:
-            totSysTT = totSysTT + self.link[i].flow * self.link[i].cost
 
-        allOrNothing = self.allOrNothing()
-        for i in allOrNothing:
-            shortPathTT = shortPathTT + allOrNothing[i] * self.link[i].cost
+        The flows and costs are read from the Link objects, so the result is
+        also correct after setting link.flow and calling link.updateCost.
+        """
+        flow = self._linkAttributeArray("flow")
+        cost = self._linkCostArray()
+        totSysTT = np.dot(flow, cost)
+        shortPathTT = np.dot(self._linkArray(self.allOrNothing()), cost)
 
         dem = 0
         for i in self.ODpair:
@@ -126,18 +134,14 @@ class Network:
         the weight to place on the target flows (so the weight on the current
         flows is 1 - stepSize).
 
-        *** IMPORTANT: After updating the flow on a link, you should call its
-        updateCost method, so that the travel time is updated to reflect
-        the new flow value. ***
+        The flows and costs of all links are updated at once using the link
+        arrays (see recomputeAllCosts).
 
         This method does not need to return a value.
         """
-
-        for i in self.link:
-            self.link[i].flow = (
-                stepSize * targetFlows[i] + (1 - stepSize) * self.link[i].flow
-            )
-            self.link[i].updateCost()
+        self._updateLinkFlows(
+            stepSize * self._linkArray(targetFlows) + (1 - stepSize) * self._flow
+        )
 
         # raise utils.NotYetAttemptedException
 
@@ -154,56 +158,80 @@ class Network:
         precision.
         """
 
-        temp_link = copy.deepcopy(self.link)
-        """
-      lb = 0
-      ub = 1
-      while ub - lb > precision:
-          
-          #Bisection method
-          delta = 0
-          stepSize = (lb + ub)/2
-          for i in temp_link:
-              temp_link[i].flow = stepSize*targetFlows[i] + (1 - stepSize)*self.link[i].flow
-              temp_link[i].updateCost()
-              delta = delta + temp_link[i].cost*(targetFlows[i] - self.link[i].flow)
-          if delta < 0: 
-              lb = stepSize
-          else:
-              ub = stepSize
-          """
+        target = self._linkArray(targetFlows)
+        direction = target - self._flow
+
         # Newton Method
         stepSize = 0.5
         prevStepSize = 0
         while abs(stepSize - prevStepSize) > precision:
-            deltaf = 0
-            deltafdash = 0
-            for i in temp_link:
-                temp_link[i].flow = (
-                    stepSize * targetFlows[i] + (1 - stepSize) * self.link[i].flow
-                )
-                temp_link[i].updateCost()
-
-                vcRatio = temp_link[i].flow / temp_link[i].capacity
-                deltaf = deltaf + temp_link[i].cost * (
-                    targetFlows[i] - self.link[i].flow
-                )
-                if temp_link[i].flow > 0:
-                    delta = (
-                        temp_link[i].alpha
-                        * temp_link[i].beta
-                        * temp_link[i].freeFlowTime
-                        * pow(vcRatio, temp_link[i].beta)
-                    ) / temp_link[i].flow
-                    deltafdash = deltafdash + delta * pow(
-                        targetFlows[i] - self.link[i].flow, 2
-                    )
+            flow = stepSize * target + (1 - stepSize) * self._flow
+            deltaf = np.dot(self._bprCost(flow), direction)
+            deltafdash = np.dot(self._bprDerivative(flow), direction ** 2)
             prevStepSize = stepSize
             stepSize = max(0, min(1, stepSize - deltaf / deltafdash))
 
         return stepSize
         # raise utils.NotYetAttemptedException
 
+    def conjugateTargetFlows(
+        self,
+        allOrNothing,
+        prevTarget=None,
+        prevPrevTarget=None,
+        prevStepSize=None,
+        biconjugate=False,
+    ):
+        """
+        This method returns the target link flows used by the conjugate ('CFW')
+        and bi-conjugate ('BFW') Frank-Wolfe algorithms (Mitradjieva and Lindberg,
+        2013).  The all-or-nothing flows are blended with the target flows of the
+        previous iteration(s), so that the new search direction is conjugate to
+        the previous one(s) with respect to the Hessian of the Beckmann function.
+
+        allOrNothing is the dictionary of all-or-nothing link flows, prevTarget
+        and prevPrevTarget are the target flow arrays (ordered as self._linkIDs)
+        of the two previous iterations, and prevStepSize is the step size taken
+        in the previous iteration.  The target flows are returned as an array.
+        """
+        aon = self._linkArray(allOrNothing)
+        if prevTarget is None:
+            return aon
+
+        flow = self._flow
+        hessian = self._bprDerivative(flow)
+
+        aonDirection = aon - flow
+        prevDirection = prevTarget - flow
+
+        if biconjugate and prevPrevTarget is not None and 0 < prevStepSize < 1:
+            prevPrevDirection = (
+                prevStepSize * prevTarget - flow + (1 - prevStepSize) * prevPrevTarget
+            )
+            muDenominator = np.dot(
+                prevPrevDirection * hessian, prevPrevTarget - prevTarget
+            )
+            nuDenominator = np.dot(prevDirection * hessian, prevDirection)
+            if muDenominator != 0 and nuDenominator != 0:
+                mu = max(
+                    0,
+                    -np.dot(prevPrevDirection * hessian, aonDirection) / muDenominator,
+                )
+                nu = max(
+                    0,
+                    -np.dot(prevDirection * hessian, aonDirection) / nuDenominator
+                    + mu * prevStepSize / (1 - prevStepSize),
+                )
+                beta0 = 1 / (1 + mu + nu)
+                return beta0 * (aon + nu * prevTarget + mu * prevPrevTarget)
+
+        denominator = np.dot(prevDirection * hessian, aon - prevTarget)
+        if denominator == 0:
+            return aon
+        conjugacy = np.dot(prevDirection * hessian, aonDirection) / denominator
+        conjugacy = min(max(conjugacy, 0), 1 - CONJUGATE_FRANK_WOLFE_DELTA)
+        return conjugacy * prevTarget + (1 - conjugacy) * aon
+
     def userEquilibrium(
         self,
         stepSizeRule="MSA",
@@ -215,9 +243,9 @@ class Network:
         This method uses the (link-based) convex combinations algorithm to solve
         for user equilibrium.  Arguments are the following:
            stepSizeRule -- a string specifying how the step size lambda is
-                           to be chosen.  Currently 'FW' and 'MSA' are the
-                           available choices, but you can implement more if you
-                           want.
+                           to be chosen.  Currently 'FW', 'MSA', 'CFW'
+                           (conjugate Frank-Wolfe) and 'BFW' (bi-conjugate
+                           Frank-Wolfe) are the available choices.
            maxIterations -- stop after this many iterations have been performed
            targetGap     -- stop once the gap is below this level
            gapFunction   -- pointer to the function used to calculate gap.  After
@@ -225,12 +253,14 @@ class Network:
                             choose either relativeGap or averageExcessCost.
         """
         print("Updating traffic model based on current network conditions...")
-        initialFlows = self.allOrNothing()
-        for ij in self.link:
-            self.link[ij].flow = initialFlows[ij]
-            self.link[ij].updateCost()
+        # Pick up any link parameters changed since the arrays were last built
+        self._buildLinkArrays()
+        self._updateLinkFlows(self._linkArray(self.allOrNothing()))
 
         iteration = 0
+        prevTarget = None
+        prevPrevTarget = None
+        prevStepSize = None
         now = datetime.datetime.now()
         while iteration < maxIterations:
             iteration += 1
@@ -246,6 +276,18 @@ class Network:
                 stepSize = self.FrankWolfeStepSize(targetFlows)
             elif stepSizeRule == "MSA":
                 stepSize = 1 / (iteration + 1)
+            elif stepSizeRule in ("CFW", "BFW"):
+                target = self.conjugateTargetFlows(
+                    targetFlows,
+                    prevTarget,
+                    prevPrevTarget,
+                    prevStepSize,
+                    biconjugate=(stepSizeRule == "BFW"),
+                )
+                targetFlows = dict(zip(self._linkIDs, target))
+                stepSize = self.FrankWolfeStepSize(targetFlows)
+                prevPrevTarget, prevTarget = prevTarget, target
+                prevStepSize = stepSize
             else:
                 raise BadNetworkOperationException(
                     "Unknown step size rule " + str(stepSizeRule)
@@ -255,12 +297,17 @@ class Network:
     def beckmannFunction(self):
         """
         This method evaluates the Beckmann function at the current link
-        flows.
+        flows.  The BPR integral is evaluated for all links at once using the
+        link arrays built in _buildLinkArrays.
         """
-        beckmann = 0
-        for ij in self.link:
-            beckmann += self.link[ij].calculateBeckmannComponent()
-        return beckmann
+        return transpo_compons.bpr_beckmann_array(
+            self._flow,
+            self._capacity,
+            self._fft,
+            self._alpha,
+            self._beta,
+            self._staticCost,
+        )
 
     def acyclicShortestPath(self, origin):
         """
@@ -369,6 +416,19 @@ class Network:
 
         return (backlink, cost)
 
+    def cachedShortestPath(self, origin):
+        """
+        Same as shortestPath, except that the shortest path tree from each origin
+        is stored and reused until the link costs change.  The returned
+        dictionaries are shared and should not be modified.
+        """
+        if self._shortestPathVersion != self._costVersion:
+            self._shortestPathCache.clear()
+            self._shortestPathVersion = self._costVersion
+        if origin not in self._shortestPathCache:
+            self._shortestPathCache[origin] = self.shortestPath(origin)
+        return self._shortestPathCache[origin]
+
     def allOrNothing(self):
         """
         This method generates an all-or-nothing assignment using the current link
@@ -392,7 +452,7 @@ class Network:
 
         for origin in self.node.keys():
 
-            (backlink, _) = self.shortestPath(origin)
+            (backlink, _) = self.cachedShortestPath(origin)
             for OD in [OD for OD in self.ODpair if self.ODpair[OD].origin == origin]:
                 curnode = self.ODpair[OD].destination
                 while curnode != self.ODpair[OD].origin:
@@ -446,24 +506,24 @@ class Network:
         of cycles can be detected in the algorithm for finding a topological order,
         and you should raise an exception if this is detected.
         """
-        # This implementation temporarily messes with reverse stars, must fix at end
+        # Kahn's algorithm; the in-degrees are counted from the reverse stars, so
+        # neither the adjacency matrix nor the star lists need to be modified.
+        inDegree = {i: len(self.node[i].reverseStar) for i in self.node}
+        queue = collections.deque(i for i in self.node if inDegree[i] == 0)
         numOrderedNodes = 0
-        while numOrderedNodes < self.numNodes:
-            nextNode = self.findLeastEnteringLinks()
-            if len(self.node[nextNode].reverseStar) > 0:
-                print("Error: Network given to findTopologicalOrder contains a cycle.")
-                raise BadNetworkOperationException
+        while len(queue) > 0:
+            nextNode = queue.popleft()
             numOrderedNodes += 1
             self.node[nextNode].order = numOrderedNodes
-            self.node[nextNode].reverseStar = [0] * self.numLinks
             for ij in self.node[nextNode].forwardStar:
-                self.node[self.link[ij].head].reverseStar.remove(ij)
+                j = self.link[ij].head
+                inDegree[j] -= 1
+                if inDegree[j] == 0:
+                    queue.append(j)
 
-        # Repopulate reverse star list
-        for i in self.node:
-            self.node[i].reverseStar = list()
-        for ij in self.link:
-            self.node[self.link[ij].head].reverseStar.append(ij)
+        if numOrderedNodes < self.numNodes:
+            print("Error: Network given to findTopologicalOrder contains a cycle.")
+            raise BadNetworkOperationException
 
     def createTopologicalList(self):
         """
@@ -488,33 +548,71 @@ class Network:
            2. Set link costs based on new flows (self.link[].cost), see link.py
            3. Set path costs based on new link costs (self.path[].cost), see path.py
         """
-        for ij in self.link:
-            self.link[ij].flow = 0
+        linkFlows = dict.fromkeys(self.link, 0)
         for p in self.path:
             for ij in self.path[p].links:
-                self.link[ij].flow += self.path[p].flow
-        for ij in self.link:
-            self.link[ij].updateCost()
-        for p in self.path:
-            self.path[p].updateCost()
+                linkFlows[ij] += self.path[p].flow
+        self._updateLinkFlows(self._linkArray(linkFlows))
+        for p, pathCost in zip(self.path, self.pathCostsBulk().tolist()):
+            self.path[p].cost = pathCost
+
+    def buildPathIndex(self, paths):
+        """
+        Builds a compressed (CSR-like) index of the links on the given list of
+        Path objects: the links of the k-th path are
+        pathLinkIdx[pathPtr[k]:pathPtr[k+1]], given as positions in the link
+        arrays.  Returns the tuple (pathPtr, pathLinkIdx).
+        """
+        pathPtr = np.zeros(len(paths) + 1, dtype=np.int32)
+        np.cumsum([len(path.links) for path in paths], out=pathPtr[1:])
+        pathLinkIdx = np.fromiter(
+            (self._linkIndex[ij] for path in paths for ij in path.links),
+            dtype=np.int32,
+            count=pathPtr[-1],
+        )
+        return pathPtr, pathLinkIdx
+
+    def pathCostsBulk(self, paths=None):
+        """
+        Returns the costs of the given paths (a dictionary of Path objects,
+        self.path by default) as an array in the order of the dictionary.  All
+        path costs are summed at once from the link cost array (see
+        _linkCostArray); the path index is reused as long as the same path IDs
+        are given.
+        """
+        if paths is None:
+            paths = self.path
+        pathIDs = tuple(paths)
+        if self._pathIndex is None or self._pathIndex[0] != pathIDs:
+            self._pathIndex = (pathIDs,) + self.buildPathIndex(
+                [paths[p] for p in pathIDs]
+            )
+        _, pathPtr, pathLinkIdx = self._pathIndex
+
+        pathCosts = np.zeros(len(pathIDs))
+        if len(pathLinkIdx) > 0:
+            # reduceat needs valid start positions, and does not return zero for
+            # paths without links
+            nonEmpty = pathPtr[:-1] < pathPtr[1:]
+            pathCosts[nonEmpty] = np.add.reduceat(
+                self._linkCostArray()[pathLinkIdx], pathPtr[:-1][nonEmpty]
+            )
+        return pathCosts
 
     def __str__(self, printODData=False):
         """
         Output network data; by default prints link flows and costs.
         If printODData == True, will also print OD pair demand and equilibrium costs.
         """
-        networkStr = "Link\tFlow\tCost\n"
-        for ij in sorted(self.link, key=lambda ij: self.link[ij].sortKey):
-            networkStr += "%s\t%f\t%f\n" % (ij, self.link[ij].flow, self.link[ij].cost)
+        networkStr = "Link\tFlow\tCost\n" + "".join(
+            f"{ij}\t{self.link[ij].flow:f}\t{self.link[ij].cost:f}\n"
+            for ij in self._sortedLinkIDs
+        )
         if printODData == True:
-            networkStr += "\n"
-            networkStr += "OD pair\tDemand\tLeastCost\n"
-            for ODpair in self.ODpair:
-                networkStr += "%s\t%f\t%f\n" % (
-                    ODpair,
-                    self.ODpair[ODpair].demand,
-                    self.ODpair[ODpair].leastCost,
-                )
+            networkStr += "\nOD pair\tDemand\tLeastCost\n" + "".join(
+                f"{ODpair}\t{OD.demand:f}\t{OD.leastCost:f}\n"
+                for ODpair, OD in self.ODpair.items()
+            )
         return networkStr
 
     def readFromFiles(self, networkFile, demandFile):
@@ -579,6 +677,11 @@ class Network:
                     if len(data) < 12 or data[11] != ";":
                         print("Link data line not formatted properly:\n '%s'" % line)
                         raise utils.BadFileFormatException
+                    # Intern the node and link names so that lookups with
+                    # interned names (e.g., crew locations) compare by identity
+                    data[0], data[1], data[10] = map(
+                        sys.intern, (data[0], data[1], data[10])
+                    )
 
                     # Create link
                     # linkID = (
@@ -693,54 +796,61 @@ class Network:
         Perform some basic validation checking of network, link, and node
         data to ensure reasonableness and consistency.
         """
-        valid = True
-
         # Check that link information is valid
-        for ij in self.link:
-            valid = valid and self.link[ij].head in self.node
-            valid = valid and self.link[ij].tail in self.node
-            if not valid:
-                print(
-                    "Error: Link tail/head not found: %s %s"
-                    % (self.link[ij].tail, self.link[ij].head)
-                )
+        for link in self.link.values():
+            if link.head not in self.node or link.tail not in self.node:
+                print("Error: Link tail/head not found: %s %s" % (link.tail, link.head))
                 raise utils.BadFileFormatException
-            valid = valid and self.link[ij].capacity >= 0
-            valid = valid and self.link[ij].length >= 0
-            valid = valid and self.link[ij].freeFlowTime >= 0
-            valid = valid and self.link[ij].alpha >= 0
-            valid = valid and self.link[ij].beta >= 0
-            valid = valid and self.link[ij].speedLimit >= 0
-            valid = valid and self.link[ij].toll >= 0
-            if not valid:
-                print("Link %s has negative parameters." % ij)
 
-        # Then check that all OD pairs are in range
-        # print(self.ODpair)
-        for ODpair in self.ODpair:
-            (origin, destination) = (
-                self.ODpair[ODpair].origin,
-                self.ODpair[ODpair].destination,
+        links = list(self.link.values())
+        negative = np.zeros(len(links), dtype=bool)
+        for attribute in [
+            "capacity",
+            "length",
+            "freeFlowTime",
+            "alpha",
+            "beta",
+            "speedLimit",
+            "toll",
+        ]:
+            negative |= (
+                np.fromiter(
+                    (getattr(link, attribute) for link in links),
+                    dtype=float,
+                    count=len(links),
+                )
+                < 0
             )
+        if negative.any():
+            linkIDs = list(self.link)
+            for k in np.flatnonzero(negative):
+                print("Link %s has negative parameters." % linkIDs[k])
+            raise utils.BadFileFormatException
 
-            valid = valid and origin in self.node
-            valid = valid and destination in self.node
-            if not valid:
+        # Then check that all OD pairs are in range
+        zones = {i for i, node in self.node.items() if node.isZone == True}
+        for ODpair, OD in self.ODpair.items():
+            if OD.origin not in self.node or OD.destination not in self.node:
                 print("Error: Origin/destination %s not found" % ODpair)
                 raise utils.BadFileFormatException
-            # print(self.node[origin].isZone, self.node[destination].isZone)
-            valid = valid and self.node[origin].isZone == True
-            valid = valid and self.node[destination].isZone == True
-            if not valid:
+            if OD.origin not in zones or OD.destination not in zones:
                 print(
                     "Error: Origin/destination %s does not connect two zones"
                     % str(ODpair)
                 )
                 raise utils.BadFileFormatException
-            valid = valid and self.ODpair[ODpair].demand >= 0
-            if not valid:
-                print("Error: OD pair %s has negative demand" % ODpair)
-                raise utils.BadFileFormatException
+
+        demand = np.fromiter(
+            (OD.demand for OD in self.ODpair.values()),
+            dtype=float,
+            count=len(self.ODpair),
+        )
+        if (demand < 0).any():
+            print(
+                "Error: OD pair %s has negative demand"
+                % list(self.ODpair)[np.flatnonzero(demand < 0)[0]]
+            )
+            raise utils.BadFileFormatException
 
         # Now error-check using metadata
         if self.numNodes != None and len(self.node) != self.numNodes:
@@ -755,17 +865,10 @@ class Network:
                 % (len(self.link), self.numLinks)
             )
             self.numLinks = len(self.link)
-        if (
-            self.numZones != None
-            and len([i for i in self.node if self.node[i].isZone == True])
-            != self.numZones
-        ):
+        if self.numZones != None and len(zones) != self.numZones:
             print(
                 "Warning: Number of zones given in network file %d different than metadata value %d"
-                % (
-                    len([i for i in self.node if self.node[i].isZone == True]),
-                    self.numZones,
-                )
+                % (len(zones), self.numZones)
             )
             self.numLinks = len(self.link)
         if self.totalDemandCheck != None:
@@ -780,26 +883,198 @@ class Network:
         Establish the forward and reverse star lists for nodes, initialize flows and
         costs for links and OD pairs.
         """
-        # Establish forward/reverse star lists, set travel times to free-flow
-        for i in self.node:
-            self.node[i].forwardStar = list()
-            self.node[i].reverseStar = list()
-
-        for ij in self.link:
-            self.node[self.link[ij].tail].forwardStar.append(ij)
-            self.node[self.link[ij].head].reverseStar.append(ij)
-            self.link[ij].cost = (
-                self.link[ij].freeFlowTime
-                + self.link[ij].length * self.distanceFactor
-                + self.link[ij].toll * self.tollFactor
-            )
-            self.link[ij].flow = 0
+        for link in self.link.values():
+            link.flow = 0
 
         for OD in self.ODpair:
             self.ODpair[OD].leastCost = 0
 
+        self._buildLinkArrays()
+        self._buildStarArrays()
+
+        # Set travel times to free-flow
+        self.recomputeAllCosts()
+
+        # Forward star order used when printing the network
+        self._sortedLinkIDs = sorted(
+            self._linkIDs, key=lambda ij: self.link[ij].sortKey
+        )
+
+    def _buildStarArrays(self):
+        """
+        Establishes the forward and reverse stars in compressed (CSR) form: the
+        positions (in the link arrays) of the links leaving the k-th node of
+        self.node are self._fwdIdx[self._fwdPtr[k]:self._fwdPtr[k+1]], and
+        likewise for entering links with _revPtr and _revIdx.  The forwardStar
+        and reverseStar attributes of the nodes are views of the corresponding
+        slices of link IDs.
+        """
+        numNodes = len(self.node)
+        numLinks = len(self._linkIDs)
+        nodeIndex = {i: k for k, i in enumerate(self.node)}
+        links = [self.link[ij] for ij in self._linkIDs]
+        tails = np.fromiter(
+            (nodeIndex[link.tail] for link in links), dtype=np.int32, count=numLinks
+        )
+        heads = np.fromiter(
+            (nodeIndex[link.head] for link in links), dtype=np.int32, count=numLinks
+        )
+
+        # Stable sorts keep the links of each star in network file order
+        self._fwdPtr = np.zeros(numNodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(tails, minlength=numNodes), out=self._fwdPtr[1:])
+        self._fwdIdx = np.argsort(tails, kind="stable").astype(np.int32)
+        self._revPtr = np.zeros(numNodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(heads, minlength=numNodes), out=self._revPtr[1:])
+        self._revIdx = np.argsort(heads, kind="stable").astype(np.int32)
+
+        linkIDs = np.empty(numLinks, dtype=object)
+        linkIDs[:] = self._linkIDs
+        fwdLinks = linkIDs[self._fwdIdx]
+        revLinks = linkIDs[self._revIdx]
+        fwdLinks.setflags(write=False)
+        revLinks.setflags(write=False)
+        fwdPtr = self._fwdPtr.tolist()
+        revPtr = self._revPtr.tolist()
+        for k, i in enumerate(self.node):
+            self.node[i].forwardStar = fwdLinks[fwdPtr[k] : fwdPtr[k + 1]]
+            self.node[i].reverseStar = revLinks[revPtr[k] : revPtr[k + 1]]
+
+    def _buildLinkArrays(self):
+        """
+        Stores the link attributes in NumPy arrays (one entry per link, in the
+        order given by self._linkIDs) so that network-wide quantities can be
+        evaluated without looping over the Link objects.  The flow array is kept
+        in sync with the links by the Network methods that change flows, and
+        the cost array is read again after link costs change (see
+        _linkCostArray); call this again after changing other link attributes
+        directly.
+        """
+        self._linkIDs = list(self.link)
+        self._linkIndex = {ij: k for k, ij in enumerate(self._linkIDs)}
+        self._capacity = self._linkAttributeArray("capacity")
+        self._fft = self._linkAttributeArray("freeFlowTime")
+        self._alpha = self._linkAttributeArray("alpha")
+        self._beta = self._linkAttributeArray("beta")
+        self._staticCost = self._linkAttributeArray("_staticCost")
+        self._flow = self._linkAttributeArray("flow")
+        self._cost = self._bprCost(self._flow)
+        self._costArrayVersion = self._costVersion
+
+    def _linkAttributeArray(self, attribute):
+        """
+        Returns the given attribute of every Link object as an array ordered as
+        self._linkIDs.
+        """
+        return np.fromiter(
+            (getattr(self.link[ij], attribute) for ij in self._linkIDs),
+            dtype=float,
+            count=len(self._linkIDs),
+        )
+
+    def _linkCostArray(self):
+        """
+        Returns the link costs as an array ordered as self._linkIDs.  The cost
+        array is read again from the link.cost attributes if the costs were
+        changed outside recomputeAllCosts, e.g., by Link.updateCost.
+        """
+        if self._costArrayVersion != self._costVersion:
+            self._cost = self._linkAttributeArray("cost")
+            self._costArrayVersion = self._costVersion
+        return self._cost
+
+    def refreshStaticCosts(self):
+        """
+        Recalculates the toll and distance-related cost of every link, e.g.,
+        after changing tollFactor or distanceFactor, and updates the link arrays
+        and costs accordingly.
+        """
+        for ij in self.link:
+            self.link[ij]._recomputeStaticCost()
+        self._buildLinkArrays()
+        self.recomputeAllCosts()
+
+    def _linkArray(self, linkValues):
+        """
+        Converts a dictionary whose keys are link IDs into an array ordered as
+        self._linkIDs.
+        """
+        return np.fromiter(
+            (linkValues[ij] for ij in self._linkIDs),
+            dtype=float,
+            count=len(self._linkIDs),
+        )
+
+    def _bprCost(self, flow):
+        """
+        Returns the cost of every link at the given link flows (an array ordered
+        as self._linkIDs), using the same relation as Link.calculateCost.
+        """
+        return transpo_compons.bpr_cost_array(
+            flow,
+            self._capacity,
+            self._fft,
+            self._alpha,
+            self._beta,
+            self._staticCost,
+        )
+
+    def _bprDerivative(self, flow):
+        """
+        Returns the derivative of the BPR travel time of every link with respect
+        to its flow, i.e., the diagonal of the Hessian of the Beckmann function.
+        """
+        vcRatio = np.maximum(flow / self._capacity, 0)
+        derivative = np.zeros(len(flow))
+        np.divide(
+            self._alpha * self._beta * self._fft * vcRatio ** self._beta,
+            flow,
+            out=derivative,
+            where=vcRatio > 0,
+        )
+        return derivative
+
+    def recomputeAllCosts(self):
+        """
+        Recalculates the costs of all links from the current link flows in a
+        single vectorized BPR evaluation, and updates the link.cost attributes.
+        """
+        self._cost = self._bprCost(self._flow)
+        for ij, linkCost in zip(self._linkIDs, self._cost.tolist()):
+            self.link[ij].cost = linkCost
+        self.invalidateCostCaches()
+        self._costArrayVersion = self._costVersion
+
+    def invalidateCostCaches(self):
+        """
+        Discards the shortest path trees and path costs computed at the previous
+        link costs.  Link.updateCost and the Network methods that change flows
+        call this already; call it after setting the cost attribute of links
+        directly.
+        """
+        self._costVersion += 1
+
+    def _updateLinkFlows(self, flow):
+        """
+        Sets the link flows to the given array (ordered as self._linkIDs) and
+        recalculates the link costs.
+        """
+        self._flow = flow
+        for ij, linkFlow in zip(self._linkIDs, flow.tolist()):
+            self.link[ij].flow = linkFlow
+        self.recomputeAllCosts()
+
+    def calculateTravelTime(self, origin, destination):
+        """
+        Returns the shortest travel time from origin to destination without
+        reconstructing the path.  The shortest path tree from origin is looked
+        up in (or added to) the shortest path cache, so repeated queries from the
+        same origin are dictionary lookups until the link costs change.
+        """
+        return self.cachedShortestPath(origin)[1][destination]
+
     def calculateShortestTravelTime(self, origin, destination):
-        backlink, cost = self.shortestPath(origin)
+        backlink, cost = self.cachedShortestPath(origin)
 
         travel_time = cost[destination]
         path = []
@@ -1,5 +1,78 @@
 # import infrarisk.src.physical.interdependencies as interdependencies
 
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True, error_model="numpy")
+def bpr_power(vcRatio, beta):
+    """
+    Raises the volume/capacity ratio to the power beta, using repeated squaring
+    when beta is a non-negative integer (as with the default beta of 4) instead
+    of the generic floating-point power.
+    """
+    exponent = int(beta)
+    if exponent != beta or exponent < 0:
+        return vcRatio ** beta
+    result = 1.0
+    while exponent > 0:
+        if exponent & 1:
+            result *= vcRatio
+        vcRatio *= vcRatio
+        exponent >>= 1
+    return result
+
+
+@njit(cache=True, error_model="numpy")
+def bpr_cost(flow, capacity, freeFlowTime, alpha, beta, staticCost):
+    """
+    Calculates the cost of a link using the BPR relation, adding in the static
+    (toll and distance-related) cost.
+    """
+    vcRatio = flow / capacity
+    # Protect against negative flows, 0^0 errors.
+    if vcRatio <= 0:
+        return freeFlowTime + staticCost
+    travelTime = freeFlowTime * (1 + alpha * bpr_power(vcRatio, beta))
+    return travelTime + staticCost
+
+
+@njit(cache=True, error_model="numpy")
+def bpr_beckmann(flow, capacity, freeFlowTime, alpha, beta, staticCost):
+    """
+    Calculates the integral of the BPR function (plus the static toll and
+    distance-related cost) of a link from zero to the given flow.
+    """
+    vcRatio = flow / capacity
+    # Protect against negative flows, 0^0 errors.
+    if vcRatio <= 0:
+        return 0.0
+    return flow * (
+        staticCost + freeFlowTime * (1 + alpha / (beta + 1) * bpr_power(vcRatio, beta))
+    )
+
+
+@njit(cache=True, error_model="numpy", parallel=True)
+def bpr_cost_array(flow, capacity, freeFlowTime, alpha, beta, staticCost):
+    """Vectorized bpr_cost; all arguments are link arrays."""
+    cost = np.empty(flow.shape[0])
+    for i in prange(flow.shape[0]):
+        cost[i] = bpr_cost(
+            flow[i], capacity[i], freeFlowTime[i], alpha[i], beta[i], staticCost[i]
+        )
+    return cost
+
+
+@njit(cache=True, error_model="numpy", parallel=True)
+def bpr_beckmann_array(flow, capacity, freeFlowTime, alpha, beta, staticCost):
+    """Sum of bpr_beckmann over all links, i.e., the Beckmann function."""
+    beckmann = 0.0
+    for i in prange(flow.shape[0]):
+        beckmann += bpr_beckmann(
+            flow[i], capacity[i], freeFlowTime[i], alpha[i], beta[i], staticCost[i]
+        )
+    return beckmann
+
 
 class Link:
     """
@@ -46,6 +119,19 @@ class Link:
         self.sortKey = (
             tail * network.numLinks + head
         )  # makes for easy sorting in forward star order
+        self._recomputeStaticCost()
+
+    def _recomputeStaticCost(self):
+        """
+        Stores the part of the link cost that does not depend on the flow, i.e.,
+        the toll and distance-related costs.  Call again (or use
+        Network.refreshStaticCosts) after changing the toll, the length, or the
+        network tollFactor and distanceFactor.
+        """
+        self._staticCost = (
+            self.toll * self.network.tollFactor
+            + self.length * self.network.distanceFactor
+        )
 
     def calculateCost(self):
         """
@@ -56,17 +142,9 @@ class Link:
         vcRatio = self.flow / self.capacity
         # Protect against negative flows, 0^0 errors.
         if vcRatio <= 0:
-            return (
-                self.freeFlowTime
-                + self.toll * self.network.tollFactor
-                + self.length * self.network.distanceFactor
-            )
+            return self.freeFlowTime + self._staticCost
         travelTime = self.freeFlowTime * (1 + self.alpha * pow(vcRatio, self.beta))
-        return (
-            travelTime
-            + self.toll * self.network.tollFactor
-            + self.length * self.network.distanceFactor
-        )
+        return travelTime + self._staticCost
 
     def calculateBeckmannComponent(self):
         """
@@ -78,17 +156,18 @@ class Link:
         if vcRatio <= 0:
             return 0
         return self.flow * (
-            self.toll * self.network.tollFactor
-            + self.length * self.network.distanceFactor
+            self._staticCost
             + self.freeFlowTime
             * (1 + self.alpha / (self.beta + 1) * pow(vcRatio, self.beta))
         )
 
     def updateCost(self):
         """
-        Same as calculateCost, except that the link.cost attribute is updated as well.
+        Same as calculateCost, except that the link.cost attribute is updated as well,
+        and the shortest paths cached by the network are invalidated.
         """
         self.cost = self.calculateCost()
+        self.network.invalidateCostCaches()
 
 
 class Node:
@@ -120,16 +199,24 @@ class Path:
         self.links = links
         self.network = network
         self.flow = flow
+        self._cachedVersion = -1
+        self._cachedCost = None
         self.updateCost()
 
     def calculateCost(self):
         """
         Calculates the cost of the path by summing the cost of its constituent links.
         This cost is returned by the method and NOT stored in the cost attribute.
+        The sum is reused until the network link costs change.
         """
+        if self._cachedVersion == self.network._costVersion:
+            return self._cachedCost
+        networkLinks = self.network.link
         cost = 0
         for ij in self.links:
-            cost += self.network.link[ij].cost
+            cost += networkLinks[ij].cost
+        self._cachedCost = cost
+        self._cachedVersion = self.network._costVersion
         return cost
 
     def updateCost(self):
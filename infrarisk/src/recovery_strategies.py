@@ -184,7 +184,7 @@ class CrewDistanceStrategy:
 
                 travel_time = 1e10
                 for nearest_node in nearest_nodes:
-                    _, curr_tt = self.integrated_network.tn.calculateShortestTravelTime(
+                    curr_tt = self.integrated_network.tn.calculateTravelTime(
                         self.integrated_network.get_water_crew_loc(), nearest_node
                     )
 
@@ -207,7 +207,7 @@ class CrewDistanceStrategy:
 
                 travel_time = 1e10
                 for nearest_node in nearest_nodes:
-                    _, curr_tt = self.integrated_network.tn.calculateShortestTravelTime(
+                    curr_tt = self.integrated_network.tn.calculateTravelTime(
                         self.integrated_network.get_power_crew_loc(), nearest_node
                     )
 
@@ -227,7 +227,7 @@ class CrewDistanceStrategy:
 
                 travel_time = 1e10
                 for nearest_node in nearest_nodes:
-                    _, curr_tt = self.integrated_network.tn.calculateShortestTravelTime(
+                    curr_tt = self.integrated_network.tn.calculateTravelTime(
                         self.integrated_network.get_transpo_crew_loc(), nearest_node
                     )
 
@@ -406,16 +406,17 @@ class ZoneBasedStrategy:
         power_zone_dict = dict()
         water_zone_dict = dict()
 
-        node_link_dict = self.integrated_network.get_node_link_dict()
+        compon_role_dict = self.integrated_network.get_compon_role_dict()
         G = self.integrated_network.integrated_graph
 
         for compon in self.integrated_network.get_disrupted_components():
             compon_details = interdependencies.get_compon_details(compon)
 
             compon_infra = compon_details[0]
-            if compon_details[1] in node_link_dict[compon_infra]["node"]:
+            compon_role = compon_role_dict[compon_infra].get(compon_details[1])
+            if compon_role == "node":
                 compon_geometry = Point(G.nodes[compon]["coord"])
-            elif compon_details[1] in node_link_dict[compon_infra]["link"]:
+            elif compon_role == "link":
                 compon_key = [
                     (u, v)
                     for u, v, e in self.integrated_network.integrated_graph.edges(
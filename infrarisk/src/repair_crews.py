@@ -4,6 +4,18 @@
 class WaterRepairCrew:
     """Water network repair crew class"""
 
+    __slots__ = (
+        "_name",
+        "_init_loc",
+        "_crew_size",
+        "availability_status",
+        "components_repaired",
+        "next_trip_start",
+        "crew_loc",
+        "curr_loc",
+        "expertise",
+    )
+
     def __init__(self, name=None, init_loc=None, crew_size=None):
         """Initiates a water repair crew for the network recovery
 
@@ -64,6 +76,18 @@ class WaterRepairCrew:
 class PowerRepairCrew:
     """Power network repair crew class"""
 
+    __slots__ = (
+        "_name",
+        "_init_loc",
+        "_crew_size",
+        "availability_status",
+        "components_repaired",
+        "next_trip_start",
+        "crew_loc",
+        "curr_loc",
+        "expertise",
+    )
+
     def __init__(self, name=None, init_loc=None, crew_size=None):
         """Initiates a water repair crew for the network recovery
 
@@ -124,6 +148,18 @@ class PowerRepairCrew:
 class TranspoRepairCrew:
     """Traffic network repair crew class"""
 
+    __slots__ = (
+        "_name",
+        "_init_loc",
+        "_crew_size",
+        "availability_status",
+        "components_repaired",
+        "next_trip_start",
+        "crew_loc",
+        "curr_loc",
+        "expertise",
+    )
+
     def __init__(self, name=None, init_loc=None, crew_size=None):
         """Initiates a water repair crew for the network recovery
 
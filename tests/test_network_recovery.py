@@ -0,0 +1,49 @@
+"""Tests for the recovery actions of the NetworkRecovery class."""
+
+import pathlib
+import types
+import unittest
+
+import infrarisk.src.physical.transportation.network as transpo
+from infrarisk.src.network_recovery import NetworkRecovery
+
+TRANSPO_FOLDER = (
+    pathlib.Path(__file__).parents[1] / "infrarisk/data/networks/in2/transportation"
+)
+
+
+class TranspoLinkFailureTest(unittest.TestCase):
+    """Failing and restoring a road link is reflected in the crew travel times."""
+
+    def setUp(self):
+        tn = transpo.Network(
+            f"{TRANSPO_FOLDER}/transpo_net.tntp",
+            f"{TRANSPO_FOLDER}/transpo_trips.tntp",
+            f"{TRANSPO_FOLDER}/transpo_node.tntp",
+        )
+        # Only the transportation network is needed to fail and restore links
+        self.network_recovery = NetworkRecovery.__new__(NetworkRecovery)
+        self.network_recovery.network = types.SimpleNamespace(tn=tn)
+        self.tn = tn
+
+    def test_failed_link_changes_travel_time(self):
+        path, travel_time = self.tn.calculateShortestTravelTime("T_J1", "T_J7")
+        self.assertEqual(self.tn.calculateTravelTime("T_J1", "T_J7"), travel_time)
+
+        self.network_recovery.fail_transpo_link(path[0])
+        failed_path, failed_travel_time = self.tn.calculateShortestTravelTime(
+            "T_J1", "T_J7"
+        )
+        self.assertGreater(failed_travel_time, travel_time)
+        self.assertNotIn(path[0], failed_path)
+        self.assertEqual(
+            self.tn.calculateTravelTime("T_J1", "T_J7"), failed_travel_time
+        )
+        self.assertEqual(failed_travel_time, self.tn.shortestPath("T_J1")[1]["T_J7"])
+
+        self.network_recovery.restore_transpo_link(path[0])
+        self.assertEqual(self.tn.calculateTravelTime("T_J1", "T_J7"), travel_time)
+
+
+if __name__ == "__main__":
+    unittest.main()
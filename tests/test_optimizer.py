@@ -0,0 +1,131 @@
+"""Tests for the repair order evaluation of the BruteForceOptimizer."""
+
+import unittest
+
+from infrarisk.src.optimizer import BruteForceOptimizer
+
+# Repair orders simulated in the current process, see FakeSimulation
+SIMULATED_REPAIR_ORDERS = []
+
+
+class FakeResilienceMetrics:
+    """Resilience metrics whose AUC values depend on the repair order only."""
+
+    def __init__(self, repair_order):
+        score = sum(
+            (position + 1) * (int(component[-1]) % 7)
+            for position, component in enumerate(repair_order)
+        )
+        self.power_auc_pcs = 0.1 * score
+        self.water_auc_pcs = 0.2 * score
+        self.weighed_pcs_auc = 0.5 * (self.power_auc_pcs + self.water_auc_pcs)
+
+    def calculate_power_resmetric(self, network_recovery):
+        pass
+
+    def calculate_water_resmetrics(self, network_recovery):
+        pass
+
+    def set_weighted_auc_metrics(self):
+        pass
+
+
+class FakeNetworkRecovery:
+    def schedule_recovery(self, repair_order):
+        self.repair_order = list(repair_order)
+
+
+class FakeSimulation:
+    """A picklable stand-in for the Simulation class that records the repair
+    orders it simulates instead of running the infrastructure models.
+    """
+
+    def __init__(self, components_to_repair):
+        self.components_to_repair = list(components_to_repair)
+        self.components_repaired = []
+        self.network_recovery = FakeNetworkRecovery()
+
+    def get_components_to_repair(self):
+        return list(self.components_to_repair)
+
+    def get_components_repaired(self):
+        return list(self.components_repaired)
+
+    def update_repaired_components(self, component):
+        self.components_to_repair.remove(component)
+        self.components_repaired.append(component)
+
+    def expand_event_table(self, initial_sequence):
+        pass
+
+    def simulate_interdependent_effects(self, network_recovery):
+        SIMULATED_REPAIR_ORDERS.append(tuple(network_recovery.repair_order))
+        return FakeResilienceMetrics(network_recovery.repair_order)
+
+
+def auc_values(results):
+    return [result[:4] for result in results]
+
+
+class EvaluateRepairOrdersTest(unittest.TestCase):
+    """Parallel and cached evaluations give the same results as serial ones."""
+
+    def setUp(self):
+        SIMULATED_REPAIR_ORDERS.clear()
+        self.components = ["P_L1", "W_P2", "P_L3", "W_P5"]
+
+    def test_parallel_results_match_serial(self):
+        simulation = FakeSimulation(self.components)
+        serial = BruteForceOptimizer(prediction_horizon=3)
+        parallel = BruteForceOptimizer(prediction_horizon=3, max_workers=2)
+
+        serial_results = list(
+            serial.evaluate_repair_orders(
+                simulation, serial.get_repair_permutations(simulation)
+            )
+        )
+        parallel_results = list(
+            parallel.evaluate_repair_orders(
+                simulation, parallel.get_repair_permutations(simulation)
+            )
+        )
+
+        self.assertEqual(len(serial_results), 24)
+        self.assertEqual(auc_values(parallel_results), auc_values(serial_results))
+        self.assertEqual(parallel._prefix_cache, serial._prefix_cache)
+
+    def test_cached_repair_orders_are_not_simulated_again(self):
+        simulation = FakeSimulation(self.components)
+        optimizer = BruteForceOptimizer(prediction_horizon=2)
+
+        first_results = list(
+            optimizer.evaluate_repair_orders(
+                simulation, optimizer.get_repair_permutations(simulation)
+            )
+        )
+        self.assertEqual(len(SIMULATED_REPAIR_ORDERS), 12)
+
+        SIMULATED_REPAIR_ORDERS.clear()
+        second_results = list(
+            optimizer.evaluate_repair_orders(
+                simulation, optimizer.get_repair_permutations(simulation)
+            )
+        )
+        self.assertEqual(SIMULATED_REPAIR_ORDERS, [])
+        self.assertEqual(auc_values(second_results), auc_values(first_results))
+
+    def test_optimal_recovery_matches_serial(self):
+        serial = BruteForceOptimizer(prediction_horizon=2)
+        serial.find_optimal_recovery(FakeSimulation(self.components))
+        parallel = BruteForceOptimizer(prediction_horizon=2, max_workers=2)
+        parallel.find_optimal_recovery(FakeSimulation(self.components))
+
+        self.assertEqual(parallel.best_repair_strategy, serial.best_repair_strategy)
+        self.assertEqual(sorted(serial.best_repair_strategy), sorted(self.components))
+        self.assertTrue(
+            parallel.get_optimization_log().equals(serial.get_optimization_log())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
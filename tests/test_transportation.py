@@ -0,0 +1,191 @@
+"""Tests for the traffic assignment and the caches of the transportation Network."""
+
+import pathlib
+import unittest
+
+import numpy as np
+
+import infrarisk.src.physical.transportation.network as transpo
+from infrarisk.src.physical.transportation.transpo_compons import Path
+
+TRANSPO_FOLDER = (
+    pathlib.Path(__file__).parents[1] / "infrarisk/data/networks/in2/transportation"
+)
+
+# Beckmann function at the user equilibrium of the in2 network with five times
+# the demand of the trip table, as converged by the bi-conjugate Frank-Wolfe rule
+EQUILIBRIUM_BECKMANN = 1230736.0066136688
+
+
+def load_network(demand_factor=1):
+    """Loads the in2 transportation network, with the demand of every OD pair
+    scaled by demand_factor.
+    """
+    tn = transpo.Network(
+        f"{TRANSPO_FOLDER}/transpo_net.tntp",
+        f"{TRANSPO_FOLDER}/transpo_trips.tntp",
+        f"{TRANSPO_FOLDER}/transpo_node.tntp",
+    )
+    for od in tn.ODpair.values():
+        od.demand *= demand_factor
+    return tn
+
+
+def link_flows(tn):
+    return np.array([tn.link[ij].flow for ij in sorted(tn.link)])
+
+
+class UserEquilibriumTest(unittest.TestCase):
+    """The Frank-Wolfe step size rules converge to the same user equilibrium."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.networks = dict()
+        for rule, max_iterations, target_gap in [
+            ("FW", 2000, 1e-4),
+            ("CFW", 200, 1e-8),
+            ("BFW", 200, 1e-8),
+        ]:
+            tn = load_network(demand_factor=5)
+            tn.userEquilibrium(rule, max_iterations, target_gap, tn.relativeGap)
+            cls.networks[rule] = tn
+
+    def test_relative_gap_below_target(self):
+        self.assertLess(self.networks["FW"].relativeGap(), 1e-4)
+        self.assertLess(self.networks["CFW"].relativeGap(), 1e-8)
+        self.assertLess(self.networks["BFW"].relativeGap(), 1e-8)
+
+    def test_beckmann_function(self):
+        for rule, rel_tol in [("FW", 1e-4), ("CFW", 1e-8), ("BFW", 1e-8)]:
+            with self.subTest(rule=rule):
+                self.assertAlmostEqual(
+                    self.networks[rule].beckmannFunction() / EQUILIBRIUM_BECKMANN,
+                    1,
+                    delta=rel_tol,
+                )
+
+    def test_link_flows(self):
+        bfw_flows = link_flows(self.networks["BFW"])
+        np.testing.assert_allclose(
+            link_flows(self.networks["CFW"]), bfw_flows, rtol=1e-4, atol=1e-2
+        )
+        # Frank-Wolfe converges slowly, so its flows are only compared roughly
+        np.testing.assert_allclose(
+            link_flows(self.networks["FW"]), bfw_flows, atol=1e-2 * bfw_flows.max()
+        )
+
+    def test_average_excess_cost(self):
+        for rule in ["CFW", "BFW"]:
+            with self.subTest(rule=rule):
+                self.assertGreaterEqual(self.networks[rule].averageExcessCost(), 0)
+                self.assertLess(self.networks[rule].averageExcessCost(), 1e-6)
+
+    def test_unknown_step_size_rule(self):
+        tn = load_network(demand_factor=5)
+        with self.assertRaises(transpo.BadNetworkOperationException):
+            tn.userEquilibrium("XFW", 10, 1e-4, tn.relativeGap)
+
+
+class GapFunctionTest(unittest.TestCase):
+    """The gap functions are evaluated at the flows and costs of the links."""
+
+    def setUp(self):
+        self.tn = load_network(demand_factor=5)
+
+    def test_gap_after_setting_link_flows(self):
+        tn = self.tn
+        aon = tn.allOrNothing()
+        for ij, link in tn.link.items():
+            link.flow = aon[ij]
+            link.updateCost()
+
+        flows = np.array([link.flow for link in tn.link.values()])
+        costs = np.array([link.cost for link in tn.link.values()])
+        shortest_path_flows = tn.allOrNothing()
+        aon_flows = np.array([shortest_path_flows[ij] for ij in tn.link])
+        system_travel_time = np.dot(flows, costs)
+        shortest_travel_time = np.dot(aon_flows, costs)
+        total_demand = sum(od.demand for od in tn.ODpair.values())
+
+        self.assertGreater(tn.relativeGap(), 0)
+        self.assertAlmostEqual(
+            tn.relativeGap(), system_travel_time / shortest_travel_time - 1
+        )
+        self.assertAlmostEqual(
+            tn.averageExcessCost(),
+            (system_travel_time - shortest_travel_time) / total_demand,
+        )
+
+
+class CostCacheTest(unittest.TestCase):
+    """The cached stars, paths and shortest paths follow the link costs."""
+
+    def setUp(self):
+        self.tn = load_network()
+
+    def test_star_arrays_match_links(self):
+        tn = self.tn
+        for i, node in tn.node.items():
+            self.assertEqual(
+                list(node.forwardStar),
+                [ij for ij in tn.link if tn.link[ij].tail == i],
+            )
+            self.assertEqual(
+                list(node.reverseStar),
+                [ij for ij in tn.link if tn.link[ij].head == i],
+            )
+        for k, i in enumerate(tn.node):
+            fwd_links = tn._fwdIdx[tn._fwdPtr[k] : tn._fwdPtr[k + 1]]
+            rev_links = tn._revIdx[tn._revPtr[k] : tn._revPtr[k + 1]]
+            self.assertEqual(
+                [tn._linkIDs[ij] for ij in fwd_links], list(tn.node[i].forwardStar)
+            )
+            self.assertEqual(
+                [tn._linkIDs[ij] for ij in rev_links], list(tn.node[i].reverseStar)
+            )
+
+    def test_path_costs_follow_link_costs(self):
+        tn = self.tn
+        tn.path = {
+            "north": Path(("T_L1", "T_L2", "T_L4"), tn),
+            "south": Path(("T_L3", "T_L5"), tn),
+            "empty": Path((), tn),
+        }
+        np.testing.assert_allclose(tn.pathCostsBulk(), [15, 10, 0])
+        self.assertEqual(tn.path["north"].calculateCost(), 15)
+
+        link = tn.link["T_L3"]
+        link.freeFlowTime = 20
+        link.updateCost()
+        np.testing.assert_allclose(tn.pathCostsBulk(), [15, 24, 0])
+        self.assertEqual(tn.path["south"].calculateCost(), 24)
+
+        tn.link["T_L1"].cost = 10
+        tn.invalidateCostCaches()
+        np.testing.assert_allclose(tn.pathCostsBulk(), [19, 24, 0])
+        self.assertEqual(tn.path["north"].calculateCost(), 19)
+
+    def test_travel_times_follow_link_costs(self):
+        tn = self.tn
+        for origin in tn.node:
+            tn.calculateTravelTime(origin, "T_J9")
+
+        for link in tn.link.values():
+            link.cost *= 1 + int(link.tail[-1])
+        tn.invalidateCostCaches()
+
+        for origin in tn.node:
+            backlink, cost = tn.shortestPath(origin)
+            for destination in tn.node:
+                self.assertEqual(
+                    tn.calculateTravelTime(origin, destination), cost[destination]
+                )
+                path, travel_time = tn.calculateShortestTravelTime(origin, destination)
+                self.assertEqual(travel_time, cost[destination])
+                self.assertEqual(
+                    sum(tn.link[ij].cost for ij in path), cost[destination]
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()